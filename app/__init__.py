@@ -1,27 +1,18 @@
 import os
-import importlib
+import time
 from flask import Flask
-from .db import db # Import db from the new central file
+from .db import db, configure_sqlite # Import db from the new central file
+from .json_provider import init_json
+from .tenants import init_tenants
+from .services.registry import get_registry
 
-def get_service_configs():
+def create_app(with_routes=True, config=None):
     """
-    Dynamically discovers and imports service configurations.
+    Application factory function. The seeder only needs the models and the
+    database, and passes with_routes=False to skip importing the routes.
+    `config` overrides the defaults and the environment.
     """
-    configs = []
-    services_dir = os.path.join(os.path.dirname(__file__), 'services')
-    for service_name in os.listdir(services_dir):
-        service_path = os.path.join(services_dir, service_name)
-        if os.path.isdir(service_path) and '__init__.py' in os.listdir(service_path):
-            try:
-                module = importlib.import_module(f'.services.{service_name}', package='app')
-                if hasattr(module, 'SERVICE_CONFIG'):
-                    configs.append(getattr(module, 'SERVICE_CONFIG'))
-            except ImportError as e:
-                print(f"Could not import service {service_name}: {e}")
-    return configs
-
-def create_app():
-    """Application factory function."""
+    started = time.perf_counter()
     app = Flask(__name__, instance_relative_config=True)
 
     basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -29,18 +20,74 @@ def create_app():
         SECRET_KEY='dev',
         SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(basedir, 'report.db'),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        # 'offset' (numbered pages) or 'keyset' (cursor links, constant cost on deep pages)
+        PAGINATION_MODE='offset',
+        # How list totals are counted: 'exact', 'cached' or 'none' (keyset mode only)
+        PAGINATION_COUNT='exact',
+        # /api/data responses cached in memory until the next seeder run, and
+        # optionally on disk so they survive restarts
+        API_CACHE_SIZE=256,
+        API_CACHE_DIR=None,
+        # Seconds between checks for a new data version written by the seeder
+        DATA_VERSION_TTL=2,
+        # Server-Timing headers and /_debug/requests, off unless asked for
+        INSTRUMENTATION=False,
+        INSTRUMENTATION_HISTORY=100,
+        INSTRUMENTATION_SLOW_STATEMENTS=5,
+        # With instrumentation on, sampled stacks of requests slower than this
+        # are written to PROFILE_DIR (default: instance/profiles)
+        PROFILE_THRESHOLD_MS=None,
+        PROFILE_INTERVAL_MS=5,
+        PROFILE_DIR=None,
+        # Applied to every SQLite connection. The production server also sets
+        # SQLITE_QUERY_ONLY, since the web app never writes.
+        SQLITE_MMAP_SIZE=256 * 1024 * 1024,
+        SQLITE_CACHE_KB=64 * 1024,
+        SQLITE_QUERY_ONLY=False,
+        # gzip (or brotli, when installed) for HTML, JSON, CSS, JS and CSV
+        # responses the client accepts it for, and orjson for JSON if installed
+        COMPRESS=True,
+        COMPRESS_MIN_SIZE=500,
+        COMPRESS_GZIP_LEVEL=6,
+        COMPRESS_BROTLI_QUALITY=5,
+        FAST_JSON=True,
+        # Dashboard aggregations read the Parquet file of recommendation facts
+        # the seeder writes when DuckDB is installed; SQLite without it
+        COLUMNAR_ANALYTICS=True,
+        # Dated snapshots of every seeded report, for the /api/history diffs
+        HISTORY_DATABASE_URI='sqlite:///' + os.path.join(basedir, 'history.db'),
+        # None serves the one report above. 'prefix' (/<client>/...) or 'host'
+        # (<client>.example.com) serve every client seeded with --tenant into
+        # TENANTS_DIR, keeping the databases of TENANT_MAX_OPEN of them open.
+        TENANT_MODE=None,
+        TENANTS_DIR=os.path.join(basedir, 'tenants'),
+        TENANT_MAX_OPEN=16,
     )
+    # Settings can be overridden from the environment, e.g. FLASK_PAGINATION_MODE=keyset
+    app.config.from_prefixed_env()
+    if config:
+        app.config.update(config)
+    app.config['SQLALCHEMY_BINDS'] = {**app.config.get('SQLALCHEMY_BINDS', {}),
+                                      'history': app.config['HISTORY_DATABASE_URI']}
 
-    app.service_configs = get_service_configs()
+    # Services are discovered once per process and shared by every app
+    registry = get_registry()
+    app.extensions['service_registry'] = registry
+    app.service_configs = registry.configs
 
     # Load all service models so SQLAlchemy knows about them
     for config in app.service_configs:
-        if 'MODEL_MODULES' in config:
-            for model_module in config['MODEL_MODULES']:
-                 importlib.import_module(model_module, package='app')
+        registry.load_models(config)
 
     # Initialize extensions
     db.init_app(app)
+    configure_sqlite(app)
+    init_tenants(app)
+    init_json(app)
+
+    if not with_routes:
+        app.startup_seconds = time.perf_counter() - started
+        return app
 
     # Register all blueprints within the app context
     with app.app_context():
@@ -50,10 +97,16 @@ def create_app():
         
         for config in app.service_configs:
             if 'BLUEPRINT' in config:
-                app.register_blueprint(config['BLUEPRINT'])
+                app.register_blueprint(registry.blueprint(config))
 
         from . import context_processors
         app.context_processor(context_processors.inject_global_vars)
         app.template_filter('format_currency')(context_processors.format_currency)
 
+    from .compression import init_compression
+    init_compression(app)
+    from .instrumentation import init_instrumentation
+    init_instrumentation(app)
+
+    app.startup_seconds = time.perf_counter() - started
     return app
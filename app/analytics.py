@@ -0,0 +1,111 @@
+import csv
+import glob
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import closing
+from flask import current_app
+from .cache import get_data_version
+from .db import sqlite_path
+from .tenants import current_tenant, tenant_extensions
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# One row per recommendation instance, with everything the dashboard groups
+# by. Instances without a resource have no resource group or subscription.
+FACT_COLUMNS = (
+    ('instance_id', 'BIGINT'),
+    ('subscription_id', 'VARCHAR'),
+    ('subscription', 'VARCHAR'),
+    ('resource_group', 'VARCHAR'),
+    ('recommendation', 'VARCHAR'),
+    ('category', 'VARCHAR'),
+    ('impact', 'VARCHAR'),
+    ('potential_savings', 'DOUBLE'),
+)
+FACTS_QUERY = """
+    SELECT i.id, s.id, s.name, rg.name, t.text, t.category, t.impact, i.potential_savings
+    FROM recommendation_instances i
+    JOIN recommendation_types t ON t.id = i.recommendation_type_id
+    LEFT JOIN resources r ON r.id = i.resource_id
+    LEFT JOIN resource_groups rg ON rg.id = r.resource_group_id
+    LEFT JOIN subscriptions s ON s.id = rg.subscription_id"""
+CSV_BATCH_SIZE = 10000
+
+def facts_path_for(db_path, version):
+    """The Parquet file of the report at db_path as of a data version: report-facts-<version>.parquet."""
+    return f"{os.path.splitext(db_path)[0]}-facts-{version}.parquet"
+
+def write_facts(db_path, facts_path):
+    """
+    Writes the recommendation facts of the database at db_path to a Parquet
+    file with DuckDB, and returns the number of rows, or None without DuckDB.
+    The rows go through a temporary CSV, which DuckDB reads in parallel.
+    """
+    if duckdb is None:
+        return None
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'facts.csv')
+        rows = 0
+        with closing(sqlite3.connect(db_path)) as connection, open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            # Strings are quoted and NULLs are not, so DuckDB tells an empty string from NULL.
+            writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+            cursor = connection.execute(FACTS_QUERY)
+            while batch := cursor.fetchmany(CSV_BATCH_SIZE):
+                writer.writerows(batch)
+                rows += len(batch)
+        columns = ', '.join(f"'{name}': '{type_}'" for name, type_ in FACT_COLUMNS)
+        tmp_path = f"{facts_path}.tmp"
+        with closing(duckdb.connect()) as connection:
+            connection.execute(f"""
+                COPY (SELECT * FROM read_csv(?, header=false, quote='"', escape='"', allow_quoted_nulls=false, columns={{{columns}}}))
+                TO '{tmp_path.replace("'", "''")}' (FORMAT parquet, COMPRESSION zstd)""", [csv_path])
+    os.replace(tmp_path, facts_path)
+    return rows
+
+def remove_stale_facts(db_path, keep_path):
+    """Removes the Parquet files of earlier data versions of the report at db_path."""
+    for path in glob.glob(facts_path_for(db_path, '*')):
+        if path != keep_path:
+            os.remove(path)
+
+def _report_path():
+    tenant = current_tenant()
+    return tenant.path if tenant is not None else sqlite_path(current_app)
+
+def get_facts():
+    """
+    A DuckDB cursor over a `facts` table holding the recommendation facts of
+    the current data version, loaded in memory from the seeder's Parquet
+    file on first use. None when COLUMNAR_ANALYTICS is off, DuckDB is not
+    installed or the report has no Parquet file; callers then query SQLite.
+    """
+    if duckdb is None or not current_app.config.get('COLUMNAR_ANALYTICS'):
+        return None
+    data_version = get_data_version()
+    if data_version is None:
+        return None
+    extensions = tenant_extensions()
+    lock = extensions.setdefault('facts_lock', threading.Lock())
+    with lock:
+        loaded = extensions.get('facts')
+        if loaded is None or loaded[0] != data_version[0]:
+            path = facts_path_for(_report_path(), data_version[0])
+            connection = None
+            if os.path.exists(path):
+                connection = duckdb.connect()
+                try:
+                    connection.execute("CREATE TABLE facts AS SELECT * FROM read_parquet(?)", [path])
+                except duckdb.Error:
+                    # Removed by a newer seeder run since the version was read.
+                    connection.close()
+                    connection = None
+            # The previous version's connection is not closed, since other threads may
+            # still be reading from it; it is freed with its last cursor.
+            loaded = extensions['facts'] = (data_version[0], connection)
+    # DuckDB connections are not shared between threads; each cursor is a connection of its own.
+    return loaded[1].cursor() if loaded[1] is not None else None
@@ -0,0 +1,167 @@
+import functools
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, make_response, request
+from sqlalchemy.exc import OperationalError
+from .compression import DEFAULT_MIN_SIZE, accepted_encoding, compress
+from .db import db
+from .tenants import current_tenant, tenant_extensions
+
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_DATA_VERSION_TTL = 2  # seconds
+
+def get_data_version():
+    """
+    Returns the (version, seeded_at) stamp of the last seeder run, or None for
+    a database seeded before stamps existed. The stamp is re-read at most
+    once every DATA_VERSION_TTL seconds per process, so looking it up on
+    every request costs no query.
+    """
+    from app.services.core.models import DataVersion
+
+    state = tenant_extensions().setdefault('data_version', {'checked': 0.0, 'value': None})
+    ttl = current_app.config.get('DATA_VERSION_TTL', DEFAULT_DATA_VERSION_TTL)
+    now = time.monotonic()
+    if state['checked'] and now - state['checked'] < ttl:
+        return state['value']
+    try:
+        row = db.session.get(DataVersion, 1)
+    except OperationalError:
+        db.session.rollback()
+        row = None
+    state['value'] = (row.version, row.seeded_at) if row else None
+    state['checked'] = now
+    return state['value']
+
+class ResponseCache:
+    """
+    Thread-safe LRU of response bodies, keyed by data version and request.
+    With a directory, bodies are also written to <directory>/<version>/ so
+    they survive restarts; directories of older versions are removed the
+    first time a new version is stored.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_version = None
+
+    def _path(self, version, key):
+        return os.path.join(self.directory, version, hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, version, key):
+        with self._lock:
+            body = self._entries.get((version, key))
+            if body is not None:
+                self._entries.move_to_end((version, key))
+                return body
+        if self.directory:
+            try:
+                with open(self._path(version, key), 'rb') as f:
+                    body = f.read()
+            except OSError:
+                return None
+            self._remember(version, key, body)
+            return body
+        return None
+
+    def set(self, version, key, body):
+        self._remember(version, key, body)
+        if self.directory:
+            self._write(version, key, body)
+
+    def _remember(self, version, key, body):
+        with self._lock:
+            self._entries[(version, key)] = body
+            self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _write(self, version, key, body):
+        if self._disk_version != version:
+            for name in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+                if name != version:
+                    shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+            self._disk_version = version
+        path = self._path(version, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a concurrent reader never sees half a file.
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def get_response_cache():
+    """
+    Returns the ResponseCache of the app, or of the client in multi-tenant
+    mode, created from API_CACHE_SIZE and API_CACHE_DIR on first use.
+    """
+    extensions = tenant_extensions()
+    cache = extensions.get('response_cache')
+    if cache is None:
+        directory = current_app.config.get('API_CACHE_DIR')
+        tenant = current_tenant()
+        if directory and tenant is not None:
+            directory = os.path.join(directory, tenant.name)
+        cache = ResponseCache(current_app.config.get('API_CACHE_SIZE', DEFAULT_CACHE_SIZE), directory)
+        extensions['response_cache'] = cache
+    return cache
+
+def cached_json(view):
+    """
+    Caches the body of a JSON view's successful responses until the next seeder
+    run, keyed by endpoint, URL arguments and query string. Responses carry
+    an ETag and Last-Modified from the data version and must be revalidated,
+    so browsers get a 304 instead of the body when nothing changed.
+    With COMPRESS, the gzip or brotli body is cached too, so it is only
+    compressed once per data version.
+    Without a data version stamp the view runs uncached.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        data_version = get_data_version()
+        if data_version is None:
+            return view(*args, **kwargs)
+        version, seeded_at = data_version
+
+        key = f"{request.endpoint}|{sorted(kwargs.items())}|{sorted(request.args.items(multi=True))}"
+        cache = get_response_cache()
+        body = cache.get(version, key)
+        if body is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            body = response.get_data()
+            cache.set(version, key, body)
+        else:
+            response = current_app.response_class(body, mimetype='application/json')
+
+        encoding = accepted_encoding()
+        if encoding and len(body) >= current_app.config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE):
+            encoded_key = f"{key}|{encoding}"
+            encoded = cache.get(version, encoded_key)
+            if encoded is None:
+                encoded = compress(body, encoding)
+                cache.set(version, encoded_key, encoded)
+            response = current_app.response_class(encoded, mimetype='application/json')
+            response.headers['Content-Encoding'] = encoding
+        else:
+            encoding = None
+        if current_app.config.get('COMPRESS'):
+            response.vary.add('Accept-Encoding')
+
+        response.set_etag(f"{version}-{hashlib.sha256(key.encode()).hexdigest()[:16]}", weak=bool(encoding))
+        response.last_modified = seeded_at
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return wrapper
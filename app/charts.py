@@ -0,0 +1,63 @@
+from flask import request, url_for
+
+DEFAULT_TOP = 20
+MAX_TOP = 100
+SORT_ORDERS = ('total', 'name')
+
+def chart_args():
+    """
+    The top, min_share, sort and offset query arguments of a chart endpoint,
+    clamped to their ranges. Raises ValueError for an unknown sort order.
+    """
+    top = min(max(request.args.get('top', DEFAULT_TOP, type=int), 1), MAX_TOP)
+    min_share = min(max(request.args.get('min_share', 0.0, type=float), 0.0), 1.0)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    sort = request.args.get('sort', 'total')
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Invalid sort {sort!r}: use {' or '.join(SORT_ORDERS)}.")
+    return {'top': top, 'min_share': min_share, 'sort': sort, 'offset': offset}
+
+def top_groups(labels, series, other_label, top=DEFAULT_TOP, min_share=0.0, sort='total', offset=0):
+    """
+    Keeps the `top` largest groups of a chart, by their total over every
+    series, starting from the offset-th largest, and adds up the smaller
+    ones in a last "Other" group. Groups with less than `min_share` of the
+    grand total also go to "Other", though at least one group is kept.
+    `series` holds one list of values per dataset, aligned with `labels`.
+    The kept groups are ordered by decreasing total, or by name with
+    sort='name'. `other_label` is formatted with the number of groups in it.
+
+    Returns (labels, series, other), where other is None when at most one
+    group was left over, and otherwise says how many groups it holds and
+    where the drill-down into them starts: the same endpoint, from the
+    returned offset.
+    """
+    totals = [sum(values[index] for values in series) for index in range(len(labels))]
+    threshold = min_share * sum(totals)
+    ranked = sorted(range(len(labels)), key=lambda index: (-totals[index], str(labels[index])))
+    window = ranked[offset:offset + top]
+    # Ranked by decreasing total, so the groups above the threshold come first.
+    kept = [index for position, index in enumerate(window) if position == 0 or totals[index] >= threshold]
+    rest = ranked[offset + len(kept):]
+    if len(rest) == 1:
+        # An "Other" of a single group would only hide its name.
+        kept, rest = kept + rest, []
+    if sort == 'name':
+        kept.sort(key=lambda index: str(labels[index]))
+
+    kept_labels = [labels[index] for index in kept]
+    kept_series = [[values[index] for index in kept] for values in series]
+    if not rest:
+        return kept_labels, kept_series, None
+    kept_labels.append(other_label.format(len(rest)))
+    for values, kept_values in zip(series, kept_series):
+        kept_values.append(sum(values[index] for index in rest))
+    return kept_labels, kept_series, {'groups': len(rest), 'offset': offset + len(kept)}
+
+def drilldown_url(other):
+    """The URL of the current chart endpoint showing the groups of its "Other" bucket."""
+    if other is None:
+        return None
+    args = request.args.to_dict()
+    args['offset'] = other['offset']
+    return url_for(request.endpoint, **request.view_args, **args)
@@ -0,0 +1,109 @@
+import gzip
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_MIMETYPES = ('text/html', 'application/json', 'text/css', 'text/javascript',
+                     'application/javascript', 'text/csv', 'text/plain', 'image/svg+xml')
+DEFAULT_MIN_SIZE = 500
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 5
+# Input bytes between flushes of a streamed response.
+DEFAULT_STREAM_FLUSH_SIZE = 64 * 1024
+
+def accepted_encoding():
+    """
+    The encoding to compress the current response with: 'br' when brotli is
+    installed and the client accepts it at least as much as gzip, 'gzip',
+    or None when compression is off or the client accepts neither.
+    """
+    if not current_app.config.get('COMPRESS'):
+        return None
+    accept = request.accept_encodings
+    gzip_quality = accept['gzip']
+    if brotli is not None and accept['br'] and accept['br'] >= gzip_quality:
+        return 'br'
+    return 'gzip' if gzip_quality else None
+
+def compress(body, encoding):
+    """Compresses a whole body with the encoding returned by accepted_encoding()."""
+    config = current_app.config
+    if encoding == 'br':
+        return brotli.compress(body, quality=config.get('COMPRESS_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY))
+    return gzip.compress(body, compresslevel=config.get('COMPRESS_GZIP_LEVEL', DEFAULT_GZIP_LEVEL), mtime=0)
+
+def compress_stream(chunks, encoding, level, flush_size=DEFAULT_STREAM_FLUSH_SIZE):
+    """
+    Compresses a streamed body as it is produced. The compressor is flushed
+    after the first chunk, so e.g. the header row of an export reaches the
+    client at once, and then whenever flush_size bytes went in since the
+    last flush, so a long export keeps flowing instead of waiting for the
+    compressor's buffer to fill.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        compress_chunk, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        compress_chunk, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+    try:
+        flushed, pending = False, 0
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compress_chunk(chunk)
+            pending += len(chunk)
+            if not flushed or pending >= flush_size:
+                data += flush()
+                flushed, pending = True, 0
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def compress_response(response):
+    """
+    after_request hook compressing HTML, JSON, CSS, JavaScript and CSV
+    responses when the client accepts it: whole bodies of COMPRESS_MIN_SIZE
+    bytes or more, and streamed ones (exports, static files) as they are
+    sent. ETags are made weak, since the bytes differ from the identity
+    body. Responses already encoded, e.g. by cached_json, are left alone.
+    """
+    if (request.method == 'HEAD' or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in current_app.config.get('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed or response.direct_passthrough:
+        config = current_app.config
+        level = (config.get('COMPRESS_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY) if encoding == 'br'
+                 else config.get('COMPRESS_GZIP_LEVEL', DEFAULT_GZIP_LEVEL))
+        response.response = compress_stream(response.response, encoding, level)
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < current_app.config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE):
+            return response
+        response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def init_compression(app):
+    """Compresses responses with gzip, or brotli when installed, when COMPRESS is set."""
+    if app.config.get('COMPRESS'):
+        app.after_request(compress_response)
@@ -1,5 +1,7 @@
 from flask import current_app
 from app.db import db
+from app.cache import get_data_version
+from app.tenants import tenant_extensions
 
 def format_currency(value):
     """Formats a value as currency."""
@@ -8,7 +10,24 @@ def format_currency(value):
     return "${:,.2f}".format(value)
 
 def inject_global_vars():
-    """Makes global context available to all templates."""
+    """
+    Makes global context available to all templates. The context only changes
+    when the seeder runs, so it is built once per data version and reused,
+    which keeps the header and nav from costing any queries per page.
+    """
+    data_version = get_data_version()
+    extensions = tenant_extensions()
+    cached = extensions.get('global_context')
+    if data_version is not None and cached and cached[0] == data_version[0]:
+        return cached[1]
+
+    context = build_global_context()
+    if data_version is not None:
+        extensions['global_context'] = (data_version[0], context)
+    return context
+
+def build_global_context():
+    """Queries the client info and nav categories and sorts the nav services."""
     # FIX: Move imports inside the function to prevent circular dependencies
     from app.services.core.models import ClientInfo
     from app.services.recommendations.models import RecommendationType
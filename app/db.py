@@ -1,5 +1,93 @@
 # This file holds the shared SQLAlchemy database instance,
 # preventing circular import errors.
+import os
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
-db = SQLAlchemy()
\ No newline at end of file
+class TenantSQLAlchemy(SQLAlchemy):
+    """
+    Flask-SQLAlchemy, except that in multi-tenant mode the engines are those
+    of the client the request is for (see app.tenants), so db.session,
+    db.engine and db.engines all use that client's databases.
+    """
+
+    @property
+    def engines(self):
+        tenant = g.get('tenant') if has_app_context() else None
+        if tenant is not None:
+            return tenant.engines
+        return super().engines
+
+db = TenantSQLAlchemy()
+
+def sqlite_path(app):
+    """The file behind the app's SQLite database URI, or None for other databases."""
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if not uri.startswith('sqlite:///') or uri.endswith(':memory:'):
+        return None
+    return uri[len('sqlite:///'):]
+
+def file_identity(path):
+    """(device, inode) of a file, which changes when another file is renamed over it."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+def listen_engines(app, identifier, fn, backend=None):
+    """
+    Listens to an event of every engine of the app, or only of those of one
+    backend: the engines it has now, and in multi-tenant mode, the engines
+    opened later for each client.
+    """
+    app.extensions.setdefault('engine_listeners', []).append((identifier, fn, backend))
+    with app.app_context():
+        for engine in db.engines.values():
+            if backend is None or engine.url.get_backend_name() == backend:
+                event.listen(engine, identifier, fn)
+
+def configure_sqlite(app):
+    """
+    Applies the SQLITE_* settings to every new connection of the report and
+    history databases: a memory-mapped file and a larger page cache, and
+    with SQLITE_QUERY_ONLY, connections that refuse writes. The seeder
+    publishes a new database by renaming it over the old one, so before each
+    request the file is checked and, once it was replaced, pooled
+    connections to the old file are dropped. In multi-tenant mode, the
+    tenant router does this check for each client instead.
+    """
+    path = sqlite_path(app)
+    if path is None:
+        return
+    pragmas = [f"PRAGMA mmap_size={int(app.config['SQLITE_MMAP_SIZE'])}",
+               f"PRAGMA cache_size=-{int(app.config['SQLITE_CACHE_KB'])}"]
+    if app.config.get('SQLITE_QUERY_ONLY'):
+        pragmas.append('PRAGMA query_only=ON')
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    listen_engines(app, 'connect', on_connect, backend='sqlite')
+    if app.config.get('TENANT_MODE'):
+        return
+
+    with app.app_context():
+        engine = db.engine
+    state = {'file': file_identity(path)}
+
+    def drop_replaced_connections():
+        identity = file_identity(path)
+        if identity != state['file']:
+            if state['file'] is not None:
+                # Connections still in use finish on the old file and are closed when returned.
+                engine.dispose()
+                # A new file has a new data version stamp; re-read it now rather than after its TTL.
+                app.extensions.pop('data_version', None)
+            state['file'] = identity
+
+    app.before_request(drop_replaced_connections)
@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+
+@contextmanager
+def capture_queries(engine):
+    """
+    Collects a (statement, parameters) tuple for every SQL statement executed
+    on the engine while the context is active.
+    """
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+def explain_query_plan(engine, statement, parameters=()):
+    """Returns the 'detail' column of SQLite's EXPLAIN QUERY PLAN for a statement."""
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [row[-1] for row in rows]
+
+def find_table_scans(plan):
+    """
+    Returns the plan steps that read a whole table without an index, e.g.
+    'SCAN vms'. Scans through an index ('SCAN resources USING INDEX ...')
+    and searches are not reported.
+    """
+    return [step for step in plan if step.startswith('SCAN ') and ' USING ' not in step]
+
+@contextmanager
+def assert_max_queries(engine, limit):
+    """
+    Runs the block like capture_queries and raises AssertionError if it
+    executed more than `limit` statements, listing them in the message.
+    """
+    with capture_queries(engine) as queries:
+        yield queries
+    if len(queries) > limit:
+        statements = '\n'.join(' '.join(statement.split()) for statement, _ in queries)
+        raise AssertionError(f"{len(queries)} queries executed, expected at most {limit}:\n{statements}")
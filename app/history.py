@@ -0,0 +1,279 @@
+import os
+from datetime import datetime
+from sqlalchemy import text
+from .db import db
+
+DEFAULT_DIFF_LIMIT = 500
+MAX_DIFF_LIMIT = 5000
+
+class HistorySnapshot(db.Model):
+    """One report in the history database, keyed by its report date."""
+    __bind_key__ = 'history'
+    __tablename__ = 'snapshots'
+    id = db.Column(db.Integer, primary_key=True)
+    report_date = db.Column(db.Date, unique=True, nullable=False)
+    client_name = db.Column(db.String)
+    seeded_at = db.Column(db.DateTime, nullable=False)
+    resource_count = db.Column(db.Integer, nullable=False)
+    recommendation_count = db.Column(db.Integer, nullable=False)
+    potential_savings = db.Column(db.Float, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'report_date': self.report_date.isoformat(),
+            'client_name': self.client_name,
+            'seeded_at': self.seeded_at.isoformat(timespec='seconds'),
+            'resource_count': self.resource_count,
+            'recommendation_count': self.recommendation_count,
+            'potential_savings': self.potential_savings,
+        }
+
+# Versions are valid from snapshot valid_from up to, but not including,
+# snapshot valid_to, which is NULL while the version is current. A snapshot
+# only adds versions for what appeared or changed, so the history grows with
+# churn, not with the size of each report.
+class ResourceVersion(db.Model):
+    __bind_key__ = 'history'
+    __tablename__ = 'resource_versions'
+    id = db.Column(db.Integer, primary_key=True)
+    resource_id = db.Column(db.String, nullable=False)
+    name = db.Column(db.String)
+    type = db.Column(db.String)
+    resource_group = db.Column(db.String)
+    subscription = db.Column(db.String)
+    valid_from = db.Column(db.Integer, db.ForeignKey('snapshots.id'), nullable=False)
+    valid_to = db.Column(db.Integer, db.ForeignKey('snapshots.id'))
+    __table_args__ = (
+        # At most one current version per resource; also serves the recording step's lookups.
+        db.Index('ix_resource_versions_current', 'resource_id', unique=True, sqlite_where=text('valid_to IS NULL')),
+        db.Index('ix_resource_versions_resource', 'resource_id', 'valid_from'),
+        # Diffs read only the versions that start or end between two snapshots.
+        db.Index('ix_resource_versions_valid_from', 'valid_from'),
+        db.Index('ix_resource_versions_valid_to', 'valid_to'),
+    )
+
+class HistoryRecommendationType(db.Model):
+    """Recommendation types seen in any snapshot, deduplicated by their text."""
+    __bind_key__ = 'history'
+    __tablename__ = 'recommendation_types'
+    id = db.Column(db.Integer, primary_key=True)
+    text = db.Column(db.String, unique=True, nullable=False)
+    category = db.Column(db.String)
+    impact = db.Column(db.String)
+
+class RecommendationVersion(db.Model):
+    __bind_key__ = 'history'
+    __tablename__ = 'recommendation_versions'
+    id = db.Column(db.Integer, primary_key=True)
+    resource_id = db.Column(db.String, nullable=False)
+    type_id = db.Column(db.Integer, db.ForeignKey('recommendation_types.id'), nullable=False)
+    potential_savings = db.Column(db.Float)
+    valid_from = db.Column(db.Integer, db.ForeignKey('snapshots.id'), nullable=False)
+    valid_to = db.Column(db.Integer, db.ForeignKey('snapshots.id'))
+    __table_args__ = (
+        db.Index('ix_recommendation_versions_current', 'resource_id', 'type_id', unique=True,
+                 sqlite_where=text('valid_to IS NULL')),
+        db.Index('ix_recommendation_versions_valid_from', 'valid_from'),
+        db.Index('ix_recommendation_versions_valid_to', 'valid_to'),
+    )
+
+# The data of the attached report database, in the shape of the version tables.
+_CURRENT_RESOURCES = """
+    CREATE TEMP TABLE current_resources AS
+    SELECT r.id AS resource_id, r.name, r.type, rg.name AS resource_group, s.name AS subscription
+    FROM report.resources r
+    JOIN report.resource_groups rg ON rg.id = r.resource_group_id
+    JOIN report.subscriptions s ON s.id = rg.subscription_id
+"""
+_CURRENT_RECOMMENDATIONS = """
+    CREATE TEMP TABLE current_recommendations AS
+    SELECT i.resource_id, h.id AS type_id, i.potential_savings
+    FROM report.recommendation_instances i
+    JOIN report.recommendation_types t ON t.id = i.recommendation_type_id
+    JOIN recommendation_types h ON h.text = t.text
+    WHERE i.resource_id IS NOT NULL
+"""
+
+def history_path():
+    """The file of the history database, or None when it is not a SQLite file."""
+    url = db.engines['history'].url
+    return url.database if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:') else None
+
+def history_exists():
+    """Whether anything was recorded yet; reading a missing SQLite file would create it."""
+    path = history_path()
+    return path is None or os.path.exists(path)
+
+def _version_step(connection, table, current, key, attributes, snapshot_id):
+    """
+    Closes the current versions in `table` whose row in `current` is gone or
+    differs, then opens a version for every row of `current` that has no
+    current version left. Returns (opened, closed).
+    """
+    same = ' AND '.join([f"c.{column} = {table}.{column}" for column in key] +
+                        [f"c.{column} IS {table}.{column}" for column in attributes])
+    closed = connection.exec_driver_sql(
+        f"UPDATE {table} SET valid_to = ? WHERE valid_to IS NULL AND NOT EXISTS "
+        f"(SELECT 1 FROM {current} c WHERE {same})", (snapshot_id,)).rowcount
+    columns = ', '.join(key + attributes)
+    matches_key = ' AND '.join(f"c.{column} = v.{column}" for column in key)
+    opened = connection.exec_driver_sql(
+        f"INSERT INTO {table} ({columns}, valid_from) SELECT {columns}, ? FROM {current} c WHERE NOT EXISTS "
+        f"(SELECT 1 FROM {table} v WHERE v.valid_to IS NULL AND {matches_key})", (snapshot_id,)).rowcount
+    return opened, closed
+
+def record_snapshot(report_path, report_date, client_name):
+    """
+    Adds the report database at report_path to the history as the snapshot
+    of report_date, or replaces that snapshot if it is the latest one.
+    Raises ValueError for a report older than the latest snapshot, since
+    versions can only be appended. Returns a dict of what changed.
+    """
+    db.create_all(bind_key='history')
+    engine = db.engines['history']
+    with engine.connect() as connection:
+        # The history is written in place while the web app reads it, unlike report.db.
+        connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+        connection.exec_driver_sql('ATTACH DATABASE ? AS report', (report_path,))
+        connection.commit()
+        try:
+            latest = connection.execute(text(
+                "SELECT id, report_date FROM snapshots ORDER BY id DESC LIMIT 1")).first()
+            existing = connection.execute(text(
+                "SELECT id FROM snapshots WHERE report_date = :date"), {'date': report_date.isoformat()}).scalar()
+            if existing is not None and existing != latest.id:
+                raise ValueError(f"The history has snapshots newer than {report_date}.")
+            if existing is None and latest is not None and report_date.isoformat() < latest.report_date:
+                raise ValueError(f"{report_date} is older than the latest snapshot, {latest.report_date}.")
+
+            resource_count, recommendation_count, savings = connection.exec_driver_sql(
+                "SELECT (SELECT count(*) FROM report.resources), count(*), coalesce(sum(potential_savings), 0) "
+                "FROM report.recommendation_instances WHERE resource_id IS NOT NULL").one()
+            values = {'client_name': client_name, 'seeded_at': datetime.now(), 'resource_count': resource_count,
+                      'recommendation_count': recommendation_count, 'potential_savings': savings}
+            if existing is not None:
+                # Re-seeding the same report: undo its versions, then record it again.
+                snapshot_id = existing
+                for table in ('resource_versions', 'recommendation_versions'):
+                    connection.exec_driver_sql(f"DELETE FROM {table} WHERE valid_from = ?", (snapshot_id,))
+                    connection.exec_driver_sql(f"UPDATE {table} SET valid_to = NULL WHERE valid_to = ?", (snapshot_id,))
+                connection.execute(HistorySnapshot.__table__.update()
+                                   .where(HistorySnapshot.id == snapshot_id).values(**values))
+            else:
+                snapshot_id = connection.execute(HistorySnapshot.__table__.insert().values(
+                    report_date=report_date, **values)).inserted_primary_key[0]
+
+            connection.exec_driver_sql(
+                "INSERT INTO recommendation_types (text, category, impact) "
+                "SELECT text, category, impact FROM report.recommendation_types WHERE text IS NOT NULL "
+                "ON CONFLICT (text) DO UPDATE SET category = excluded.category, impact = excluded.impact")
+            connection.exec_driver_sql(_CURRENT_RESOURCES)
+            connection.exec_driver_sql('CREATE UNIQUE INDEX temp.ix_current_resources ON current_resources (resource_id)')
+            connection.exec_driver_sql(_CURRENT_RECOMMENDATIONS)
+            connection.exec_driver_sql('CREATE UNIQUE INDEX temp.ix_current_recommendations '
+                                       'ON current_recommendations (resource_id, type_id)')
+            resources = _version_step(connection, 'resource_versions', 'current_resources', ['resource_id'],
+                                      ['name', 'type', 'resource_group', 'subscription'], snapshot_id)
+            recommendations = _version_step(connection, 'recommendation_versions', 'current_recommendations',
+                                            ['resource_id', 'type_id'], ['potential_savings'], snapshot_id)
+            connection.exec_driver_sql('DROP TABLE current_resources')
+            connection.exec_driver_sql('DROP TABLE current_recommendations')
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.exec_driver_sql('DETACH DATABASE report')
+    return {'snapshot_id': snapshot_id, 'replaced': existing is not None,
+            'resource_versions': resources, 'recommendation_versions': recommendations}
+
+def prune_history(keep):
+    """
+    Keeps the `keep` newest snapshots and deletes the versions that ended
+    before the oldest of them. Returns the number of snapshots deleted.
+    """
+    with db.engines['history'].begin() as connection:
+        oldest_kept = connection.execute(text(
+            "SELECT id FROM snapshots ORDER BY id DESC LIMIT 1 OFFSET :offset"), {'offset': keep - 1}).scalar()
+        if oldest_kept is None:
+            return 0
+        for table in ('resource_versions', 'recommendation_versions'):
+            connection.exec_driver_sql(f"DELETE FROM {table} WHERE valid_to <= ?", (oldest_kept,))
+        return connection.exec_driver_sql("DELETE FROM snapshots WHERE id < ?", (oldest_kept,)).rowcount
+
+def list_snapshots():
+    if not history_exists():
+        return []
+    return HistorySnapshot.query.order_by(HistorySnapshot.report_date).all()
+
+_RESOURCE_COLUMNS = ('resource_id', 'name', 'type', 'resource_group', 'subscription')
+_RECOMMENDATION_SELECT = """
+    SELECT v.resource_id, v.type_id, t.text AS recommendation, t.category, t.impact, v.potential_savings,
+           (SELECT r.name FROM resource_versions r WHERE r.resource_id = v.resource_id
+            ORDER BY r.valid_from DESC LIMIT 1) AS resource_name
+    FROM recommendation_versions v JOIN recommendation_types t ON t.id = v.type_id
+"""
+
+def _changed_rows(connection, select, old_id, new_id):
+    """
+    The versions current at old_id that ended by new_id, and those current
+    at new_id that started after old_id: everything that differs between
+    the two snapshots, read by range scans on valid_to and valid_from.
+    """
+    ended = connection.execute(text(
+        f"{select} WHERE v.valid_to > :old AND v.valid_to <= :new AND v.valid_from <= :old"),
+        {'old': old_id, 'new': new_id}).mappings().all()
+    started = connection.execute(text(
+        f"{select} WHERE v.valid_from > :old AND v.valid_from <= :new AND (v.valid_to IS NULL OR v.valid_to > :new)"),
+        {'old': old_id, 'new': new_id}).mappings().all()
+    return ended, started
+
+def _compare(ended, started, key, attributes, limit):
+    """Splits the changed versions into added, removed and changed rows by key."""
+    before = {tuple(row[k] for k in key): dict(row) for row in ended}
+    after = {tuple(row[k] for k in key): dict(row) for row in started}
+    added = [after[k] for k in after.keys() - before.keys()]
+    removed = [before[k] for k in before.keys() - after.keys()]
+    changed = [{'before': before[k], 'after': after[k]} for k in before.keys() & after.keys()
+               if any(before[k][a] != after[k][a] for a in attributes)]
+    return {
+        'counts': {'added': len(added), 'removed': len(removed), 'changed': len(changed)},
+        'added': sorted(added, key=lambda row: [str(row[k]) for k in key])[:limit],
+        'removed': sorted(removed, key=lambda row: [str(row[k]) for k in key])[:limit],
+        'changed': sorted(changed, key=lambda row: [str(row['after'][k]) for k in key])[:limit],
+    }
+
+def diff_snapshots(old, new, limit=DEFAULT_DIFF_LIMIT):
+    """
+    The resources and recommendations added, removed (for recommendations:
+    resolved) and changed from snapshot `old` to snapshot `new`, at most
+    `limit` of each, with the full counts. Either snapshot may be the newer.
+    """
+    swapped = old.id > new.id
+    first, last = (new, old) if swapped else (old, new)
+    with db.engines['history'].connect() as connection:
+        resources = _compare(*_changed_rows(connection, f"SELECT {', '.join(_RESOURCE_COLUMNS)} FROM resource_versions v",
+                                            first.id, last.id),
+                             ['resource_id'], _RESOURCE_COLUMNS[1:], limit)
+        recommendations = _compare(*_changed_rows(connection, _RECOMMENDATION_SELECT, first.id, last.id),
+                                   ['resource_id', 'type_id'], ['potential_savings'], limit)
+    for part in (resources, recommendations):
+        for row in part['added'] + part['removed']:
+            row.pop('type_id', None)
+        for row in part['changed']:
+            row['before'].pop('type_id', None)
+            row['after'].pop('type_id', None)
+        if swapped:
+            part['added'], part['removed'] = part['removed'], part['added']
+            part['counts']['added'], part['counts']['removed'] = part['counts']['removed'], part['counts']['added']
+            part['changed'] = [{'before': row['after'], 'after': row['before']} for row in part['changed']]
+    recommendations['resolved'] = recommendations.pop('removed')
+    recommendations['counts']['resolved'] = recommendations['counts'].pop('removed')
+    return {
+        'from': old.to_dict(),
+        'to': new.to_dict(),
+        'potential_savings_change': new.potential_savings - old.potential_savings,
+        'resources': resources,
+        'recommendations': recommendations,
+    }
@@ -0,0 +1,206 @@
+import heapq
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from flask import (Blueprint, before_render_template, current_app, g, has_request_context,
+                   render_template, request, template_rendered)
+from .db import listen_engines
+
+DEFAULT_HISTORY = 100
+DEFAULT_SLOW_STATEMENTS = 5
+DEFAULT_PROFILE_INTERVAL_MS = 5
+MAX_PARAMETERS_LENGTH = 300
+
+debug_bp = Blueprint('debug', __name__, url_prefix='/_debug')
+
+class RequestStats:
+    """What the instrumentation recorded for one request."""
+
+    def __init__(self, method, path, endpoint, slow_statements):
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.status = None
+        self.wall_ms = None
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.profile_file = None
+        self.thread_id = threading.get_ident()
+        self._slow_statements = slow_statements
+        self._slowest = []  # min-heap of (ms, order, statement, parameters)
+        self._order = itertools.count()
+
+    def add_statement(self, statement, parameters, ms):
+        self.sql_count += 1
+        self.sql_ms += ms
+        entry = (ms, next(self._order), statement, parameters)
+        if len(self._slowest) < self._slow_statements:
+            heapq.heappush(self._slowest, entry)
+        elif ms > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def slowest_statements(self):
+        """The slowest statements, slowest first, as (ms, statement, parameters)."""
+        return [(ms, statement, parameters) for ms, _, statement, parameters in sorted(self._slowest, reverse=True)]
+
+    def server_timing(self):
+        """The Server-Timing header value, which browsers show in their network panel."""
+        return (f'app;dur={self.wall_ms:.1f}, '
+                f'sql;dur={self.sql_ms:.1f};desc="{self.sql_count} queries", '
+                f'tpl;dur={self.template_ms:.1f}')
+
+class StackSampler:
+    """
+    Samples the stacks of the threads serving profiled requests from one
+    background thread, which runs only while such a request is in flight.
+    Stacks are counted in the folded format flamegraph tools read.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._samples[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id):
+        """Stops sampling a thread and returns its stack counts."""
+        with self._lock:
+            return self._samples.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._samples:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, counts in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counts[fold_stack(frame)] += 1
+
+def fold_stack(frame):
+    """A stack as 'outermost;...;innermost', one 'function (file:line)' per frame."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':'))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+def write_profile(directory, stats, samples):
+    """Writes the folded stacks of a slow request and returns the file path."""
+    os.makedirs(directory, exist_ok=True)
+    endpoint = re.sub(r'[^\w.-]', '_', stats.endpoint or 'unknown')
+    path = os.path.join(directory, f"{stats.started_at:%Y%m%d-%H%M%S-%f}-{endpoint}-{stats.wall_ms:.0f}ms.folded")
+    with open(path, 'w') as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+def _current_stats():
+    return g.get('_request_stats') if has_request_context() else None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['_query_started'].pop()
+    stats = _current_stats()
+    if stats is not None:
+        stats.add_statement(statement, repr(parameters)[:MAX_PARAMETERS_LENGTH], (time.perf_counter() - started) * 1000)
+
+def _before_render(sender, template, context, **extra):
+    stats = _current_stats()
+    if stats is not None:
+        g.setdefault('_template_started', []).append(time.perf_counter())
+
+def _after_render(sender, template, context, **extra):
+    stats = _current_stats()
+    if stats is not None and g.get('_template_started'):
+        stats.template_ms += (time.perf_counter() - g._template_started.pop()) * 1000
+
+def init_instrumentation(app):
+    """
+    Turns on per-request instrumentation when INSTRUMENTATION is set: every
+    response gets a Server-Timing header with its wall, SQL and template time,
+    the last INSTRUMENTATION_HISTORY requests are listed at /_debug/requests
+    with their slowest statements, and with PROFILE_THRESHOLD_MS set, the
+    sampled stacks of slower requests are written to PROFILE_DIR.
+    For streamed responses such as exports, the Server-Timing header only
+    covers the view, since it is sent ahead of the body, while the history
+    entry and the profile are completed once the body has been sent.
+    """
+    if not app.config.get('INSTRUMENTATION'):
+        return
+    history = deque(maxlen=app.config.get('INSTRUMENTATION_HISTORY') or DEFAULT_HISTORY)
+    slow_statements = app.config.get('INSTRUMENTATION_SLOW_STATEMENTS') or DEFAULT_SLOW_STATEMENTS
+    threshold = app.config.get('PROFILE_THRESHOLD_MS')
+    profile_dir = app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+    sampler = None
+    if threshold is not None:
+        sampler = StackSampler((app.config.get('PROFILE_INTERVAL_MS') or DEFAULT_PROFILE_INTERVAL_MS) / 1000)
+    app.extensions['instrumentation'] = {'history': history, 'profile_dir': profile_dir if sampler else None}
+
+    listen_engines(app, 'before_cursor_execute', _before_cursor_execute)
+    listen_engines(app, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_request_stats():
+        if request.endpoint in (None, 'static') or request.endpoint.startswith('debug.'):
+            return
+        g._request_stats = RequestStats(request.method, request.full_path.rstrip('?'), request.endpoint, slow_statements)
+        if sampler:
+            sampler.start(threading.get_ident())
+
+    def close_request_stats(stats):
+        stats.wall_ms = (time.perf_counter() - stats.started) * 1000
+        if sampler:
+            samples = sampler.stop(stats.thread_id)
+            if stats.wall_ms >= threshold and samples:
+                stats.profile_file = write_profile(profile_dir, stats, samples)
+        history.append(stats)
+
+    @app.after_request
+    def finish_request_stats(response):
+        stats = g.get('_request_stats')
+        if stats is None:
+            return response
+        stats.wall_ms = (time.perf_counter() - stats.started) * 1000
+        stats.status = response.status_code
+        response.headers.add('Server-Timing', stats.server_timing())
+        if response.is_streamed:
+            # The body runs after this hook, inside the request context that
+            # stream_with_context keeps, so its queries still land in these stats.
+            response.call_on_close(lambda: close_request_stats(stats))
+        else:
+            g.pop('_request_stats')
+            close_request_stats(stats)
+        return response
+
+    app.register_blueprint(debug_bp)
+
+@debug_bp.route('/requests')
+def requests_list():
+    instrumentation = current_app.extensions['instrumentation']
+    requests = sorted(instrumentation['history'], key=lambda s: s.started, reverse=True)
+    return render_template('debug_requests.html', requests=requests, profile_dir=instrumentation['profile_dir'])
@@ -1,77 +1,167 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from sqlalchemy import func
 from app.db import db
+from app.analytics import get_facts
+from app.cache import cached_json
+from app.charts import chart_args, drilldown_url, top_groups
+from app.json_provider import columnar
+from app.history import DEFAULT_DIFF_LIMIT, MAX_DIFF_LIMIT, diff_snapshots, list_snapshots
+from app.services.core.kpis import get_kpis
 from app.services.recommendations.models import RecommendationInstance, RecommendationType
 from app.services.core.models import Resource, ResourceGroup, Subscription
 
 api_bp = Blueprint('api', __name__)
+TABLE_FORMATS = ('rows', 'columns')
+
+def table_format():
+    """?format=rows (a list of objects, the default) or ?format=columns (see columnar()), or None if invalid."""
+    value = request.args.get('format', 'rows')
+    return value if value in TABLE_FORMATS else None
+
+def pie_chart(rows, args):
+    """A pie chart's labels and data from (label, count) rows, its smallest slices grouped in "Other"."""
+    labels, (data,), other = top_groups([row[0] for row in rows], [[row[1] for row in rows]], 'Other ({} more)', **args)
+    if other:
+        other['drilldown'] = drilldown_url(other)
+    return {'labels': labels, 'data': data, 'other': other}
 
 @api_bp.route('/data/recommendations-summary')
+@cached_json
 def recommendations_summary():
-    category_data = db.session.query(
-        RecommendationType.category, func.count(RecommendationInstance.id)
-    ).join(RecommendationInstance).group_by(RecommendationType.category).order_by(func.count(RecommendationInstance.id).desc()).all()
-    
-    impact_data = db.session.query(
-        RecommendationType.impact, func.count(RecommendationInstance.id)
-    ).join(RecommendationInstance).group_by(RecommendationType.impact).all()
-    
+    try:
+        args = chart_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    recommendations = get_kpis().get('recommendations', {})
+    category_data = recommendations.get('categories', [])
+    impact_data = recommendations.get('impacts', [])
+
     return jsonify({
-        'categories': {
-            'labels': [row[0] for row in category_data],
-            'data': [row[1] for row in category_data]
-        },
-        'impacts': {
-            'labels': [row[0] for row in impact_data],
-            'data': [row[1] for row in impact_data]
-        }
+        'categories': pie_chart(category_data, args),
+        'impacts': pie_chart(impact_data, args)
     })
 
 @api_bp.route('/data/impact-by-category/<category>')
+@cached_json
 def impact_by_category(category):
+    try:
+        args = chart_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     formatted_category = category.replace('-', ' ')
-    impact_data = db.session.query(
-        RecommendationType.impact, func.count(RecommendationInstance.id)
-    ).join(RecommendationInstance).filter(
-        func.lower(RecommendationType.category) == func.lower(formatted_category)
-    ).group_by(RecommendationType.impact).all()
-    
-    return jsonify({
-        'labels': [row[0] for row in impact_data],
-        'data': [row[1] for row in impact_data]
-    })
+    facts = get_facts()
+    if facts is not None:
+        with facts:
+            impact_data = facts.execute(
+                "SELECT impact, count(*) FROM facts WHERE lower(category) = lower(?) "
+                "GROUP BY impact ORDER BY impact NULLS FIRST", [formatted_category]).fetchall()
+    else:
+        impact_data = db.session.query(
+            RecommendationType.impact, func.count(RecommendationInstance.id)
+        ).join(RecommendationInstance).filter(
+            func.lower(RecommendationType.category) == func.lower(formatted_category)
+        ).group_by(RecommendationType.impact).all()
+
+    return jsonify(pie_chart(impact_data, args))
 
 @api_bp.route('/data/recommendations-by-subscription/<group_by>')
+@cached_json
 def recommendations_by_subscription(group_by):
+    """
+    Recommendation counts of the `top` subscriptions with the most
+    recommendations, per impact or category, plus an "Other" bar adding up
+    the rest; its `drilldown` URL charts the next subscriptions.
+    """
     if group_by not in ['impact', 'category']:
         return jsonify({"error": "Invalid grouping"}), 400
+    try:
+        args = chart_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     grouping_attr = getattr(RecommendationType, group_by)
-    
-    recs_data_query = db.session.query(
-        Subscription.name,
-        grouping_attr,
-        func.count(RecommendationInstance.id)
-    ).select_from(RecommendationInstance).join(RecommendationInstance.resource) \
-     .join(Resource.resource_group).join(ResourceGroup.subscription) \
-     .join(RecommendationInstance.recommendation_type) \
-     .filter(grouping_attr.isnot(None)) \
-     .group_by(Subscription.name, grouping_attr).all()
+    facts = get_facts()
+    if facts is not None:
+        # group_by is one of two column names, checked above.
+        with facts:
+            recs_data_query = facts.execute(
+                f"SELECT subscription, {group_by}, count(*) FROM facts "
+                f"WHERE subscription IS NOT NULL AND {group_by} IS NOT NULL GROUP BY ALL").fetchall()
+    else:
+        recs_data_query = db.session.query(
+            Subscription.name,
+            grouping_attr,
+            func.count(RecommendationInstance.id)
+        ).select_from(RecommendationInstance).join(RecommendationInstance.resource) \
+         .join(Resource.resource_group).join(ResourceGroup.subscription) \
+         .join(RecommendationInstance.recommendation_type) \
+         .filter(grouping_attr.isnot(None)) \
+         .group_by(Subscription.name, grouping_attr).all()
 
-    all_subs = Subscription.query.order_by(Subscription.name).all()
+    all_subs = db.session.query(Subscription.name, Subscription.id).order_by(Subscription.name).all()
     all_grouping_keys = [row[0] for row in db.session.query(grouping_attr).distinct().filter(grouping_attr.isnot(None)).order_by(grouping_attr).all()]
-    
-    subs_data = {sub.name: {'guid': sub.id, 'counts': {key: 0 for key in all_grouping_keys}} for sub in all_subs}
-    
+
+    # One list of counts per grouping key, in subscription order, filled in place.
+    positions = {name: index for index, (name, guid) in enumerate(all_subs)}
+    datasets = {key: {"label": key, "data": [0] * len(all_subs)} for key in all_grouping_keys}
     for sub_name, grouping_key, count in recs_data_query:
-        if sub_name in subs_data and grouping_key in subs_data[sub_name]['counts']:
-            subs_data[sub_name]['counts'][grouping_key] = count
-            
-    labels = [f"{name} ({data['guid']})" for name, data in subs_data.items()]
-    datasets = {key: {"label": key, "data": []} for key in all_grouping_keys}
+        if sub_name in positions and grouping_key in datasets:
+            datasets[grouping_key]['data'][positions[sub_name]] = count
+
+    labels = [f"{name} ({guid})" for name, guid in all_subs]
+    series = [dataset['data'] for dataset in datasets.values()]
+    labels, series, other = top_groups(labels, series, 'Other ({} subscriptions)', **args)
+    for dataset, data in zip(datasets.values(), series):
+        dataset['data'] = data
+    if other:
+        other['drilldown'] = drilldown_url(other)
+    return jsonify({'labels': labels, 'datasets': list(datasets.values()),
+                    'total_groups': len(all_subs), 'offset': args['offset'], 'other': other})
+
+@api_bp.route('/history/snapshots')
+@cached_json
+def history_snapshots():
+    output = table_format()
+    if output is None:
+        return jsonify({"error": "Invalid format"}), 400
+    snapshots = [snapshot.to_dict() for snapshot in list_snapshots()]
+    return jsonify(columnar(snapshots) if output == 'columns' else snapshots)
+
+@api_bp.route('/history/diff')
+@cached_json
+def history_diff():
+    """
+    Added, removed and changed resources and recommendations between two
+    history snapshots, by report date: ?from=2024-05-01&to=2024-05-08.
+    `to` defaults to the latest snapshot and `from` to the one before it.
+    With ?format=columns, the lists of rows are in columnar form.
+    """
+    output = table_format()
+    if output is None:
+        return jsonify({"error": "Invalid format"}), 400
+    snapshots = list_snapshots()
+    by_date = {snapshot.report_date.isoformat(): snapshot for snapshot in snapshots}
+    to_date = request.args.get('to') or (snapshots[-1].report_date.isoformat() if snapshots else None)
+    if to_date not in by_date:
+        return jsonify({"error": f"No history snapshot for {to_date}"}), 404
+    new = by_date[to_date]
+    from_date = request.args.get('from')
+    if not from_date:
+        earlier = [snapshot for snapshot in snapshots if snapshot.report_date < new.report_date]
+        if not earlier:
+            return jsonify({"error": f"No history snapshot before {to_date}"}), 404
+        from_date = earlier[-1].report_date.isoformat()
+    if from_date not in by_date:
+        return jsonify({"error": f"No history snapshot for {from_date}"}), 404
 
-    for sub_name, data in subs_data.items():
-        for key in all_grouping_keys:
-            datasets[key]['data'].append(data['counts'].get(key, 0))
-            
-    return jsonify({'labels': labels, 'datasets': list(datasets.values())})
+    limit = min(max(request.args.get('limit', DEFAULT_DIFF_LIMIT, type=int), 0), MAX_DIFF_LIMIT)
+    diff = diff_snapshots(by_date[from_date], new, limit=limit)
+    if output == 'columns':
+        for part in (diff['resources'], diff['recommendations']):
+            for name, rows in part.items():
+                if name == 'changed':
+                    part[name] = {'before': columnar([row['before'] for row in rows]),
+                                  'after': columnar([row['after'] for row in rows])}
+                elif name != 'counts':
+                    part[name] = columnar(rows)
+    return jsonify(diff)
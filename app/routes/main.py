@@ -1,8 +1,9 @@
 from flask import Blueprint, render_template, current_app, request, url_for
-from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
 from app.db import db
+from app.search import search_index, MAX_RESULTS, RESULTS_PER_PAGE
+from app.services.core.kpis import get_kpis
 from app.services.core.models import Resource
-from app.services.recommendations.models import RecommendationInstance, RecommendationType
 import importlib
 
 main_bp = Blueprint('main', __name__)
@@ -10,44 +11,52 @@ main_bp = Blueprint('main', __name__)
 @main_bp.route('/')
 def index():
     """Dashboard route."""
-    total_recs = db.session.query(func.count(RecommendationInstance.id)).scalar()
-    high_impact = RecommendationInstance.query.join(RecommendationType).filter(RecommendationType.impact == 'High').count()
-    total_savings = db.session.query(func.sum(RecommendationInstance.potential_savings)).scalar()
-    
-    service_configs = current_app.service_configs
-    service_counts = {}
-    for config in service_configs:
-        if config.get('SHOW_IN_NAV'):
-            resource_type = config.get('RESOURCE_TYPE')
-            if resource_type:
-                count = Resource.query.filter_by(type=resource_type).count()
-                service_counts[config['KEY']] = count
-
+    # Totals and counts come from the snapshot the seeder writes, in one row lookup.
+    kpis = get_kpis()
+    recommendations = kpis.get('recommendations', {})
     return render_template('index.html',
-                           total_recs=total_recs,
-                           high_impact=high_impact,
-                           total_savings=total_savings or 0,
-                           service_counts=service_counts)
+                           total_recs=recommendations.get('total', 0),
+                           high_impact=dict(recommendations.get('impacts', [])).get('High', 0),
+                           total_savings=recommendations.get('potential_savings', 0),
+                           service_counts=kpis['resources'])
 
 @main_bp.route('/search')
 def search():
-    query = request.args.get('q', '')
-    results = []
+    query = request.args.get('q', '').strip()
+    page = max(min(request.args.get('page', 1, type=int), -(-MAX_RESULTS // RESULTS_PER_PAGE)), 1)
+    results, total, corrected_query = [], 0, None
     if query:
-        search_term = f"%{query}%"
-        
-        found_resources = Resource.query.filter(Resource.name.ilike(search_term)).all()
-        
         service_configs = current_app.service_configs
         route_map = {s['RESOURCE_TYPE']: s['DETAIL_ROUTE'] for s in service_configs if s.get('RESOURCE_TYPE') and s.get('DETAIL_ROUTE')}
+        try:
+            rows, total, corrected_query = search_index(db, query, page=page)
+        except OperationalError:
+            # Databases seeded before the search index existed: fall back to a capped name match.
+            db.session.rollback()
+            rows = [{'kind': 'resource', 'ref': r.id, 'name': r.name, 'resource_type': r.type,
+                     'resource_group': None, 'subscription': None}
+                    for r in Resource.query.filter(Resource.name.ilike(f"%{query}%")).limit(MAX_RESULTS)]
+            total, page = len(rows), 1
 
-        for resource in found_resources:
-            detail_route = route_map.get(resource.type)
-            if detail_route:
+        for row in rows:
+            if row['kind'] == 'recommendation':
                 results.append({
-                    'name': resource.name, 
-                    'type': resource.type, 
-                    'url': url_for(detail_route, resource_id=resource.id)
+                    'name': row['text'],
+                    'type': f"Recommendation ({row['resource_type']})",
+                    'context': None,
+                    'url': url_for('recs.recommendations_list', type=row['ref'])
                 })
-            
-    return render_template('search_results.html', query=query, results=results)
+                continue
+            detail_route = route_map.get(row['resource_type'])
+            results.append({
+                'name': row['name'],
+                'type': row['resource_type'],
+                'context': ' / '.join(part for part in (row['subscription'], row['resource_group']) if part),
+                'url': url_for(detail_route, resource_id=row['ref']) if detail_route
+                       else f"https://portal.azure.com/#resource{row['ref']}"
+            })
+
+    total_pages = max(-(-total // RESULTS_PER_PAGE), 1)
+    return render_template('search_results.html', query=query, results=results, total=total,
+                           corrected_query=corrected_query, capped=total >= MAX_RESULTS,
+                           page=page, total_pages=total_pages)
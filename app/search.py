@@ -0,0 +1,157 @@
+import re
+from sqlalchemy import text
+
+SEARCH_TABLE = 'search_index'
+VOCAB_TABLE = 'search_vocab'
+MAX_RESULTS = 500
+RESULTS_PER_PAGE = 25
+# Column weights for bm25(), in table column order: a hit in the name
+# outranks a hit in the recommendation text, the group or the id.
+RANK_WEIGHTS = (10.0, 1.0, 3.0, 3.0, 5.0)
+
+def build_search_index(db):
+    """
+    Rebuilds the FTS5 search index from the seeded resources and
+    recommendation types, inside the seeder's transaction. Every resource is
+    indexed with its id and its resource group and subscription names, every
+    recommendation type with its text.
+    """
+    connection = db.session.connection()
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {VOCAB_TABLE}")
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+    # Two and three character prefixes are indexed, so short search-as-you-type
+    # queries don't have to scan the term list.
+    connection.exec_driver_sql(f"""
+        CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+            name, resource_id, resource_group, subscription, text,
+            kind UNINDEXED, ref UNINDEXED, resource_type UNINDEXED,
+            prefix='2 3'
+        )""")
+    connection.exec_driver_sql(f"CREATE VIRTUAL TABLE {VOCAB_TABLE} USING fts5vocab({SEARCH_TABLE}, 'row')")
+    recommendations = connection.exec_driver_sql(f"""
+        INSERT INTO {SEARCH_TABLE} (name, resource_id, resource_group, subscription, text, kind, ref, resource_type)
+        SELECT '', '', '', '', t.text, 'recommendation', t.id, t.category
+        FROM recommendation_types t""").rowcount
+    resources = connection.exec_driver_sql(f"""
+        INSERT INTO {SEARCH_TABLE} (name, resource_id, resource_group, subscription, text, kind, ref, resource_type)
+        SELECT r.name, r.id, rg.name, s.name, '', 'resource', r.id, r.type
+        FROM resources r
+        JOIN resource_groups rg ON rg.id = r.resource_group_id
+        JOIN subscriptions s ON s.id = rg.subscription_id
+        ORDER BY r.name""").rowcount
+    connection.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    print(f"Indexed {resources} resources and {recommendations} recommendation types for search.")
+
+def tokenize(query):
+    """Splits a search box query into lowercase terms, the way FTS5's default tokenizer does."""
+    return re.findall(r'\w+', query.lower())
+
+def match_expression(terms):
+    """
+    An FTS5 query matching rows that contain every term. The last term is
+    matched as a word prefix, since it is usually still being typed, unless
+    it is a single character, whose prefix would match most of the index.
+    """
+    *complete, last = terms
+    expression = [f'"{term}"' for term in complete]
+    expression.append(f'"{last}"*' if len(last) > 1 else f'"{last}"')
+    return ' '.join(expression)
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 once it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+def correct_terms(connection, terms):
+    """
+    Replaces each term that is not a prefix of any indexed word with the
+    closest indexed word (one edit for short terms, two for longer ones),
+    using the fts5vocab table. Only alphabetic terms are corrected, against
+    alphabetic words sharing their first letter, so only a slice of the
+    vocabulary is read. Returns None if nothing changed.
+    """
+    corrected = []
+    for term in terms:
+        known = connection.execute(
+            text(f"SELECT 1 FROM {VOCAB_TABLE} WHERE term >= :term AND term < :upper LIMIT 1"),
+            {'term': term, 'upper': term + '\uffff'}).first()
+        if known or not term.isalpha():
+            corrected.append(term)
+            continue
+        limit = 1 if len(term) <= 5 else 2
+        candidates = connection.execute(
+            text(f"SELECT term, doc FROM {VOCAB_TABLE} WHERE term >= :first AND term < :next "
+                 "AND length(term) BETWEEN :shortest AND :longest AND term NOT GLOB '*[^a-z]*'"),
+            {'first': term[0], 'next': chr(ord(term[0]) + 1),
+             'shortest': len(term) - limit, 'longest': len(term) + limit})
+        best = None
+        for candidate, documents in candidates:
+            distance = edit_distance(term, candidate, limit)
+            if distance <= limit and (best is None or (distance, -documents) < best[:2]):
+                best = (distance, -documents, candidate)
+        corrected.append(best[2] if best else term)
+    return corrected if corrected != terms else None
+
+def search_index(db, query, page=1, per_page=RESULTS_PER_PAGE):
+    """
+    Runs a ranked prefix search and returns (rows, total, corrected_query).
+    `total` is capped at MAX_RESULTS, and so is paging. If the query matches
+    nothing, it is retried with typo-corrected terms and corrected_query
+    holds what was actually searched for. Raises OperationalError when the
+    database has no search index yet.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return [], 0, None
+    connection = db.session.connection()
+    page = max(min(page, -(-MAX_RESULTS // per_page)), 1)
+
+    exact = query.strip().lower()
+    offset = (page - 1) * per_page
+
+    def run(match):
+        total = connection.execute(
+            text(f"SELECT count(*) FROM (SELECT 1 FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match LIMIT :cap)"),
+            {'match': match, 'cap': MAX_RESULTS}).scalar()
+        if not total:
+            return [], 0
+        # Resources named exactly what was typed come first. They are looked up
+        # by name rather than sorted on it, since reading the name of every match
+        # costs more than ranking them all.
+        exact_rows = connection.execute(
+            text("SELECT 'resource' AS kind, r.id AS ref, r.name, r.type AS resource_type, "
+                 "rg.name AS resource_group, s.name AS subscription, '' AS text "
+                 "FROM resources r "
+                 "JOIN resource_groups rg ON rg.id = r.resource_group_id "
+                 "JOIN subscriptions s ON s.id = rg.subscription_id "
+                 "WHERE lower(r.name) = :exact ORDER BY r.id"),
+            {'exact': exact}).mappings().all()
+        exact_refs = {row['ref'] for row in exact_rows}
+        # ORDER BY rank lets FTS5 score every match with bm25() and only read the
+        # columns of the rows returned.
+        weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+        ranked = connection.execute(
+            text(f"SELECT kind, ref, name, resource_type, resource_group, subscription, text "
+                 f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match AND rank MATCH :rank "
+                 f"ORDER BY rank LIMIT :limit"),
+            {'match': match, 'rank': f"bm25({weights})", 'limit': offset + per_page + len(exact_rows)}).mappings().all()
+        rows = list(exact_rows) + [row for row in ranked if not (row['kind'] == 'resource' and row['ref'] in exact_refs)]
+        return rows[offset:offset + per_page], total
+
+    rows, total = run(match_expression(terms))
+    corrected_query = None
+    if not total:
+        corrected = correct_terms(connection, terms)
+        if corrected:
+            rows, total = run(match_expression(corrected))
+            corrected_query = ' '.join(corrected) if total else None
+    return rows, total, corrected_query
@@ -1,9 +1,11 @@
-from .seeder import seed_core_data
-
 SERVICE_CONFIG = {
     'KEY': 'core',
     'NAME': 'Core Components',
     # FIX: Corrected model module path
     'MODEL_MODULES': ['.services.core.models'],
-    'SEEDER_FUNC': seed_core_data,
+    'SEEDER_FUNC': '.seeder:seed_core_data',
+    # Rebuilds the context maps when an incremental run skips the unchanged core CSVs.
+    'RESTORE_FUNC': '.seeder:restore_core_context',
+    'CSV_FILES': ['Subscriptions.csv', 'Azureresourcegroups.csv'],
+    'DEPENDS_ON': [],
 }
\ No newline at end of file
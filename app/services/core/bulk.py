@@ -0,0 +1,203 @@
+import csv
+import pickle
+import time
+from sqlalchemy import Column, MetaData, Table, and_, delete, exists, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+DEFAULT_CHUNK_SIZE = 5000
+SPOOL_BATCH_SIZE = 5000
+
+def iter_csv_rows(path):
+    """
+    Yields the rows of an Azure "Export to CSV" file one at a time, skipping
+    the optional 'sep=' hint line, so seeders never hold a whole file in memory.
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if 'sep=' not in f.readline().lower():
+            f.seek(0)
+        yield from csv.DictReader(f)
+
+def spool_rows(parser, context, spool_path):
+    """
+    Runs a service's PARSER_FUNC and pickles the normalized rows to spool_path
+    in batches. This is the unit of work handed to the seeder's process pool,
+    so it must only touch the CSV files, never the database.
+    Returns (spool_path, stats).
+    """
+    stats = {'skipped': 0}
+    batch = []
+    with open(spool_path, 'wb') as f:
+        for row in parser(context, stats):
+            batch.append(row)
+            if len(batch) >= SPOOL_BATCH_SIZE:
+                pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+                batch = []
+        if batch:
+            pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return spool_path, stats
+
+def iter_spooled_rows(spool_path):
+    """Yields the rows written by spool_rows, one batch in memory at a time."""
+    with open(spool_path, 'rb') as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+class BulkLoader:
+    """
+    Buffers plain row dicts for a model and writes them through Core
+    insert()/executemany in chunks, bypassing the ORM unit of work.
+
+    Rows for polymorphic models are split across the base 'resources' table
+    and the subtype table, and the discriminator column is filled in from the
+    model's polymorphic identity when the row does not provide it.
+
+    Loaders listed in `parents` are flushed before this loader writes a chunk,
+    so rows with client-assigned foreign keys never reach the database ahead
+    of the rows they reference.
+
+    With `upsert`, rows that collide on `key_columns` (the primary key by
+    default) update the existing row instead of failing. `incremental` implies
+    upsert and also records every key written in a temporary table, so that
+    delete_missing() can remove the rows that are no longer in the export.
+
+    Columns listed in `accumulate` are added up, rather than replaced, when
+    rows collide: a key written several times holds the sum of its rows. In
+    incremental mode they are zeroed first, so the sum starts from this run.
+    """
+
+    def __init__(self, db, model, chunk_size=None, label=None, parents=(),
+                 key_columns=None, upsert=False, incremental=False, accumulate=()):
+        self.db = db
+        self.model = model
+        self.parents = list(parents)
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        self.label = label or model.__tablename__
+        self.upsert = upsert or incremental
+        self.accumulate = set(accumulate)
+        self.count = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+        mapper = model.__mapper__
+        # mapper.tables is ordered base-first, so parent rows are written before child rows.
+        self.tables = []
+        for table in mapper.tables:
+            columns = [c.key for c in table.columns]
+            if key_columns and all(k in columns for k in key_columns):
+                keys = list(key_columns)
+            else:
+                keys = [c.key for c in table.primary_key.columns]
+            self.tables.append((table, columns, keys))
+        self.discriminator = None
+        if mapper.polymorphic_on is not None and mapper.polymorphic_identity is not None:
+            self.discriminator = (mapper.polymorphic_on.key, mapper.polymorphic_identity)
+
+        self._buffer = []
+        self._seen = self._create_seen_table() if incremental else None
+        if incremental and self.accumulate:
+            table = self.tables[-1][0]
+            self.db.session.execute(update(table).values({k: 0 for k in self.accumulate}))
+
+    def _create_seen_table(self):
+        table, _, keys = self.tables[-1]
+        seen = Table(f'seen_{table.name}', MetaData(),
+                     *[Column(k, table.c[k].type) for k in keys],
+                     prefixes=['TEMPORARY'])
+        connection = self.db.session.connection()
+        seen.drop(connection, checkfirst=True)
+        seen.create(connection)
+        return seen
+
+    def add(self, row):
+        """Queues a single row dict, flushing when the chunk is full."""
+        if self.discriminator:
+            key, identity = self.discriminator
+            row.setdefault(key, identity)
+        self._buffer.append(row)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def add_many(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def _insert_statement(self, table, keys, conflict_keys):
+        if not self.upsert:
+            return insert(table)
+        stmt = sqlite_insert(table)
+        update_keys = [k for k in keys if k not in conflict_keys and not table.c[k].primary_key]
+        if not update_keys:
+            return stmt.on_conflict_do_nothing(index_elements=conflict_keys)
+        return stmt.on_conflict_do_update(
+            index_elements=conflict_keys,
+            set_={k: table.c[k] + stmt.excluded[k] if k in self.accumulate else stmt.excluded[k]
+                  for k in update_keys}
+        )
+
+    def flush(self):
+        """Writes the buffered rows, one executemany per table."""
+        if not self._buffer:
+            return
+        for parent in self.parents:
+            parent.flush()
+        rows, self._buffer = self._buffer, []
+        # Every key given by any row of the chunk is written; rows without it write NULL.
+        present = set().union(*rows)
+        for table, columns, conflict_keys in self.tables:
+            keys = [c for c in columns if c in present]
+            params = [{k: row.get(k) for k in keys} for row in rows]
+            self.db.session.execute(self._insert_statement(table, keys, conflict_keys), params)
+        if self._seen is not None:
+            seen_keys = [c.key for c in self._seen.columns]
+            self.db.session.execute(insert(self._seen), [{k: row.get(k) for k in seen_keys} for row in rows])
+        self.count += len(rows)
+
+    def close(self):
+        """Flushes any remaining rows and returns the number of rows written."""
+        self.flush()
+        self.elapsed = time.perf_counter() - self.started
+        return self.count
+
+    def delete_missing(self):
+        """
+        In incremental mode, deletes the rows of this model that were not
+        written by this loader and returns how many were removed. For
+        polymorphic models only rows of this model's type are considered.
+        Does nothing for a non-incremental loader.
+        """
+        if self._seen is None:
+            return 0
+        self.close()
+        deleted = 0
+        # Subtype rows go first, while the base rows still carry the discriminator.
+        for table, _, keys in reversed(self.tables):
+            is_seen = exists().where(and_(*[self._seen.c[k] == table.c[k] for k in keys]))
+            stmt = delete(table).where(~is_seen)
+            if self.discriminator and self.discriminator[0] in table.c:
+                stmt = stmt.where(table.c[self.discriminator[0]] == self.discriminator[1])
+            result = self.db.session.execute(stmt)
+            if table is self.tables[-1][0]:
+                deleted = result.rowcount
+        self._seen.drop(self.db.session.connection())
+        self._seen = None
+        return deleted
+
+    @property
+    def rate(self):
+        """Rows ingested per second, from loader creation to close()."""
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return f"{self.count} {self.label} ({self.rate:,.0f} rows/sec)"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        return False
@@ -0,0 +1,36 @@
+from sqlalchemy import func, literal, select, union_all
+
+def compute_facets(query, columns):
+    """
+    Computes the filter options of a list page, and how many rows of `query`
+    have each one, in a single statement.
+
+    `columns` maps a facet key (the filter's URL parameter) to the column it
+    groups on. The filtered rows are selected once into a CTE, which SQLite
+    materializes because every facet reads it, and each facet is a GROUP BY
+    over that CTE, combined with UNION ALL.
+
+    Returns {key: [{'value': ..., 'count': ...}, ...]}, with values sorted
+    and NULLs left out.
+    """
+    facets = {key: [] for key in columns}
+    if not columns:
+        return facets
+
+    keys = list(columns)
+    labels = [f'facet_{i}' for i in range(len(keys))]
+    rows = query.with_entities(*[columns[key].label(label) for key, label in zip(keys, labels)]) \
+        .order_by(None).cte('facet_rows')
+
+    grouped = [
+        select(literal(i).label('facet'), rows.c[label].label('value'), func.count().label('count'))
+        .where(rows.c[label].isnot(None))
+        .group_by(rows.c[label])
+        for i, label in enumerate(labels)
+    ]
+    for facet, value, count in query.session.execute(union_all(*grouped)):
+        facets[keys[facet]].append({'value': value, 'count': count})
+
+    for options in facets.values():
+        options.sort(key=lambda option: option['value'])
+    return facets
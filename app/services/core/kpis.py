@@ -0,0 +1,38 @@
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from app.db import db
+from app.services import resolve
+from .models import KpiSnapshot, Resource
+
+def compute_kpis(db, service_configs):
+    """
+    Computes the dashboard KPIs: under 'resources', the resource count of
+    every service with a RESOURCE_TYPE, by service KEY, and under each
+    service's KEY, the dict returned by its KPI_FUNC(db), if it has one.
+    """
+    counts = dict(db.session.query(Resource.type, func.count(Resource.id)).group_by(Resource.type).all())
+    kpis = {'resources': {config['KEY']: counts.get(config['RESOURCE_TYPE'], 0)
+                          for config in service_configs if config.get('RESOURCE_TYPE')}}
+    for config in service_configs:
+        if config.get('KPI_FUNC'):
+            kpis[config['KEY']] = resolve(config, 'KPI_FUNC')(db)
+    return kpis
+
+def write_kpi_snapshot(db, service_configs):
+    """Stores the KPIs of the data seeded so far, in the seeder's transaction."""
+    db.session.merge(KpiSnapshot(id=1, kpis=compute_kpis(db, service_configs)))
+
+def get_kpis():
+    """
+    The KPI snapshot of the last seeder run. Databases seeded before
+    snapshots existed get the KPIs computed on the fly instead.
+    """
+    try:
+        snapshot = db.session.get(KpiSnapshot, 1)
+    except OperationalError:
+        db.session.rollback()
+        snapshot = None
+    if snapshot is not None:
+        return snapshot.kpis
+    return compute_kpis(db, current_app.service_configs)
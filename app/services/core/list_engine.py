@@ -0,0 +1,148 @@
+import importlib
+from flask import render_template, request
+from sqlalchemy.orm import Query
+from app.db import db
+from app.services.core.models import ResourceGroup, Subscription
+from app.services.core.export import stream_export
+from app.services.core.facets import compute_facets
+from app.services.core.pagination import paginate_list
+from app.services.recommendations.models import RecommendationRollup
+
+ALLOWED_LIMITS = [10, 25, 50, 100]
+DEFAULT_LIMIT = 25
+
+# Every resource list starts with its name and scope and ends with its recommendation totals.
+LEADING_HEADERS = [
+    {'label': 'Name', 'key': 'name', 'sortable': True, 'is_link': True, 'filterable': False},
+    {'label': 'Subscription', 'key': 'subscription_name', 'sortable': False, 'filterable': True},
+    {'label': 'Resource Group', 'key': 'resource_group_name', 'sortable': False, 'filterable': True},
+]
+TRAILING_HEADERS = [
+    {'label': '# Recs', 'key': 'recommendation_count', 'sortable': True, 'align': 'center', 'filterable': False},
+    {'label': 'Savings', 'key': 'potential_savings', 'sortable': True, 'align': 'right', 'format': 'currency', 'filterable': False},
+]
+
+# Plans by service KEY, compiled when each service's blueprint is loaded.
+LIST_PLANS = {}
+
+class ListPlan:
+    """
+    The compiled form of a service's LIST_SPEC: the table headers, the column
+    behind every key, and the base query with its joins, built once at
+    startup and shared by every request for the list page and its export.
+    """
+
+    def __init__(self, model, spec):
+        self.model = model
+        self.headers = LEADING_HEADERS + [dict(column) for column in spec['COLUMNS']] + TRAILING_HEADERS
+        # Service columns are model attributes named by their key.
+        self.attributes = [column['key'] for column in spec['COLUMNS']]
+        self.columns = {
+            'name': model.name,
+            'subscription_name': Subscription.name,
+            'resource_group_name': ResourceGroup.name,
+            'recommendation_count': RecommendationRollup.recommendation_count,
+            'potential_savings': RecommendationRollup.potential_savings,
+        }
+        self.columns.update((key, getattr(model, key)) for key in self.attributes)
+        self.filters = [h['key'] for h in self.headers if h.get('filterable')]
+        self.sorts = {h['key'] for h in self.headers if h.get('sortable')}
+        self.default_sort = spec.get('DEFAULT_SORT', 'name')
+        self.default_order = spec.get('DEFAULT_ORDER', 'asc')
+
+        # Built without a session; each request binds it to the current one.
+        self.base_query = Query([model]) \
+            .join(ResourceGroup, model.resource_group_id == ResourceGroup.id) \
+            .join(Subscription, ResourceGroup.subscription_id == Subscription.id)
+
+    def build_query(self, args):
+        """
+        Applies the filter and sort arguments of a request. Returns the
+        filtered query (for the facets), the query for the rows, the sort
+        column and order, and the active filters.
+        """
+        sort_by = args.get('sort_by', self.default_sort)
+        sort_order = args.get('sort_order', self.default_order)
+        if sort_by not in self.sorts:
+            sort_by = self.default_sort
+
+        active_filters = {}
+        base_query = self.base_query.with_session(db.session())
+        for key in self.filters:
+            filter_values = args.get(key)
+            if filter_values:
+                values_list = filter_values.split(',')
+                active_filters[key] = values_list
+                base_query = base_query.filter(self.columns[key].in_(values_list))
+
+        # Per-resource totals come from the rollup table the seeder rebuilds, which has
+        # a row for every resource, so an inner join keeps the sort on an index.
+        final_query = base_query.add_columns(
+                Subscription.name.label('subscription_name'),
+                ResourceGroup.name.label('resource_group_name'),
+                RecommendationRollup.recommendation_count,
+                RecommendationRollup.potential_savings
+            ).join(RecommendationRollup, RecommendationRollup.resource_id == self.model.id)
+        return base_query, final_query, self.columns[sort_by], sort_by, sort_order, active_filters
+
+    def build_row(self, result):
+        resource, sub_name, rg_name, rec_count, savings = result
+        row = {
+            'resource': resource,
+            'name': resource.name, 'subscription_name': sub_name, 'resource_group_name': rg_name,
+            'recommendation_count': rec_count, 'potential_savings': savings,
+        }
+        for key in self.attributes:
+            row[key] = getattr(resource, key)
+        return row
+
+    def export_columns(self):
+        return [(h['label'], self.columns[h['key']]) for h in self.headers] + [('Resource ID', self.model.id)]
+
+def resolve_model(config):
+    """The model class named by MODEL_CLASS_NAME, from the service's first model module."""
+    module = importlib.import_module(config['MODEL_MODULES'][0], package='app')
+    return getattr(module, config['MODEL_CLASS_NAME'])
+
+def register_list_routes(config):
+    """
+    Compiles a service's LIST_SPEC and adds its list page and export routes
+    to the service blueprint, under the endpoint named by LIST_ROUTE and the
+    matching `_export` endpoint. Called by the service registry when the
+    blueprint is first loaded.
+    """
+    spec = config['LIST_SPEC']
+    plan = ListPlan(resolve_model(config), spec)
+    LIST_PLANS[config['KEY']] = plan
+
+    blueprint = config['BLUEPRINT']
+    list_endpoint = config['LIST_ROUTE'].split('.', 1)[1]
+    export_endpoint = list_endpoint.removesuffix('_list') + '_export'
+    title = spec.get('TITLE', config['NAME'])
+    detail_routes = {config['RESOURCE_TYPE']: config['DETAIL_ROUTE']}
+
+    def list_view():
+        limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+        if limit not in ALLOWED_LIMITS: limit = DEFAULT_LIMIT
+
+        base_query, final_query, sort_column, sort_by, sort_order, active_filters = plan.build_query(request.args)
+        paginated_results = paginate_list(final_query, sort_column, sort_order, plan.model.id, limit)
+        rows = [plan.build_row(result) for result in paginated_results.items]
+
+        # Options and row counts for every filter dropdown, in one query.
+        filter_data = compute_facets(base_query, {key: plan.columns[key] for key in plan.filters})
+
+        return render_template(spec.get('TEMPLATE', 'resource_list.html'),
+                               title=title, detail_routes=detail_routes,
+                               export_endpoint=f"{blueprint.name}.{export_endpoint}",
+                               headers=plan.headers, rows=rows, filter_data=filter_data, active_filters=active_filters,
+                               pagination=paginated_results, limit=limit, sort_by=sort_by, sort_order=sort_order)
+
+    def export_view(fmt):
+        _, final_query, sort_column, _, sort_order, _ = plan.build_query(request.args)
+        return stream_export(final_query, sort_column, sort_order, plan.model.id,
+                             plan.export_columns(), fmt, spec.get('EXPORT_NAME', config['KEY']))
+
+    blueprint.add_url_rule('/', list_endpoint, list_view)
+    blueprint.add_url_rule('/export/<fmt>', export_endpoint, export_view)
+    return plan
@@ -1,4 +1,5 @@
 from app.db import db
+from sqlalchemy import func
 from sqlalchemy.orm import relationship
 
 class ClientInfo(db.Model):
@@ -16,18 +17,55 @@ class Subscription(db.Model):
 class ResourceGroup(db.Model):
     __tablename__ = 'resource_groups'
     id = db.Column(db.String, primary_key=True)
-    name = db.Column(db.String, nullable=False)
-    subscription_id = db.Column(db.String, db.ForeignKey('subscriptions.id'), nullable=False)
+    name = db.Column(db.String, nullable=False, index=True)
+    subscription_id = db.Column(db.String, db.ForeignKey('subscriptions.id'), nullable=False, index=True)
     subscription = relationship("Subscription", back_populates="resource_groups")
     resources = relationship("Resource", back_populates="resource_group", cascade="all, delete-orphan")
 
 class Resource(db.Model):
     __tablename__ = 'resources'
     id = db.Column(db.String, primary_key=True)
-    name = db.Column(db.String, nullable=False)
+    name = db.Column(db.String, nullable=False, index=True)
     type = db.Column(db.String, nullable=False)
-    location = db.Column(db.String)
-    resource_group_id = db.Column(db.String, db.ForeignKey('resource_groups.id'), nullable=False)
+    location = db.Column(db.String, index=True)
+    resource_group_id = db.Column(db.String, db.ForeignKey('resource_groups.id'), nullable=False, index=True)
     resource_group = relationship("ResourceGroup", back_populates="resources")
     recommendations = relationship("RecommendationInstance", back_populates="resource", cascade="all, delete-orphan")
     __mapper_args__ = {'polymorphic_on': type, 'polymorphic_identity': 'resource'}
+    # Per-type counts and name-ordered lists of one resource type.
+    __table_args__ = (db.Index('ix_resources_type_name', 'type', 'name'),)
+
+# Case-insensitive filters (e.g. in recommendations_list) compare lower(column),
+# which can only use an index built on the same expression.
+db.Index('ix_subscriptions_lower_name', func.lower(Subscription.name))
+db.Index('ix_resource_groups_lower_name', func.lower(ResourceGroup.name))
+db.Index('ix_resources_lower_type', func.lower(Resource.type))
+# Exact name matches, which the search puts first.
+db.Index('ix_resources_lower_name', func.lower(Resource.name))
+
+class SeedFile(db.Model):
+    """Content hash of each CSV a service was last seeded from, so unchanged files can be skipped."""
+    __tablename__ = 'seed_files'
+    service_key = db.Column(db.String, primary_key=True)
+    path = db.Column(db.String, primary_key=True)
+    sha256 = db.Column(db.String, nullable=False)
+    seeded_at = db.Column(db.String)
+
+class DataVersion(db.Model):
+    """
+    Single row stamped by every seeder run. Response and template caches are
+    keyed on `version`, so they never serve data from before the last seed.
+    """
+    __tablename__ = 'data_version'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.String, nullable=False)
+    seeded_at = db.Column(db.DateTime, nullable=False)
+
+class KpiSnapshot(db.Model):
+    """
+    Single row of dashboard totals, written by the seeder in the same
+    transaction as the data, so the dashboard reads them in one lookup.
+    """
+    __tablename__ = 'kpi_snapshot'
+    id = db.Column(db.Integer, primary_key=True)
+    kpis = db.Column(db.JSON, nullable=False)
@@ -0,0 +1,195 @@
+import base64
+import binascii
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, request
+from sqlalchemy import and_, asc, desc, or_
+from app.cache import get_data_version
+from app.tenants import current_tenant
+
+PAGINATION_MODES = ('offset', 'keyset')
+COUNT_MODES = ('exact', 'cached', 'none')
+COUNT_CACHE_SIZE = 256
+COUNT_CACHE_TTL = 300  # seconds
+
+_count_cache = OrderedDict()
+_count_cache_lock = threading.Lock()
+
+class ListPage:
+    """
+    One page of a list query, with what pagination_controls.html needs to
+    render either mode. `total` is None when the count mode is 'none', and
+    `first_item` is None in keyset mode when the position is not known.
+    """
+
+    def __init__(self, mode, items, limit, page=None, total=None, first_item=None,
+                 has_prev=False, has_next=False, prev_cursor=None, next_cursor=None):
+        self.mode = mode
+        self.items = items
+        self.limit = limit
+        self.page = page
+        self.total = total
+        self.first_item = first_item
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.prev_cursor = prev_cursor
+        self.next_cursor = next_cursor
+
+    @property
+    def last_item(self):
+        if self.first_item is None:
+            return None
+        return self.first_item + len(self.items) - 1
+
+    @property
+    def last_cursor(self):
+        """Cursor for the 'Last' link in keyset mode: the end of the list, read backwards."""
+        return encode_cursor({'d': 'prev', 'v': None, 'o': None})
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return max(math.ceil(self.total / self.limit), 1)
+
+def encode_cursor(data):
+    """Packs a cursor dict into an opaque, URL-safe token."""
+    raw = json.dumps(data, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Unpacks a token from encode_cursor. Returns None if it is missing or malformed."""
+    if not token:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('d') not in ('next', 'prev'):
+        return None
+    if data.get('v') is not None and not (isinstance(data['v'], list) and len(data['v']) == 2):
+        return None
+    return data
+
+def count_rows(query, mode='exact'):
+    """
+    Counts the rows of a list query. 'cached' reuses the count of an
+    identical query, of the same client and data version, for
+    COUNT_CACHE_TTL seconds, 'none' skips counting.
+    """
+    if mode == 'none':
+        return None
+    count_query = query.order_by(None)
+    if mode != 'cached':
+        return count_query.count()
+
+    compiled = count_query.statement.compile()
+    tenant = current_tenant()
+    # Keyed by data version, so a published reseed never shows the previous report's totals.
+    data_version = get_data_version()
+    key = (tenant.name if tenant else None, data_version[0] if data_version else None,
+           str(compiled), repr(sorted(compiled.params.items())))
+    with _count_cache_lock:
+        cached = _count_cache.get(key)
+        if cached and time.monotonic() - cached[1] < COUNT_CACHE_TTL:
+            _count_cache.move_to_end(key)
+            return cached[0]
+    # The count runs outside the lock, so it never holds up other requests.
+    total = count_query.count()
+    with _count_cache_lock:
+        _count_cache[key] = (total, time.monotonic())
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+    return total
+
+def _seek_condition(sort_column, key_column, sort_value, key_value, ascending):
+    """
+    Rows strictly after (sort_value, key_value) in the given direction.
+    SQLite sorts NULLs first ascending and last descending, so a NULL sort
+    value needs its own branch.
+    """
+    if ascending:
+        if sort_value is None:
+            return or_(sort_column.isnot(None), and_(sort_column.is_(None), key_column > key_value))
+        return or_(sort_column > sort_value, and_(sort_column == sort_value, key_column > key_value))
+    if sort_value is None:
+        return and_(sort_column.is_(None), key_column < key_value)
+    return or_(sort_column < sort_value, and_(sort_column == sort_value, key_column < key_value),
+               sort_column.is_(None))
+
+def paginate_list(query, sort_column, sort_order, key_column, limit):
+    """
+    Orders a list query by the sort column, with key_column as the tie
+    breaker, and returns the requested ListPage.
+
+    The PAGINATION_MODE setting picks 'offset' (the `page` argument, with
+    LIMIT/OFFSET) or 'keyset' (an opaque `cursor` argument holding the sort
+    and key values of the row to continue from, so deep pages cost the same
+    as the first). PAGINATION_COUNT picks how the total is counted, see
+    count_rows; offset mode always needs an exact or cached count.
+    """
+    mode = current_app.config.get('PAGINATION_MODE', 'offset')
+    count_mode = current_app.config.get('PAGINATION_COUNT', 'exact')
+    if mode not in PAGINATION_MODES:
+        mode = 'offset'
+    if count_mode not in COUNT_MODES:
+        count_mode = 'exact'
+    ascending = sort_order != 'desc'
+
+    if mode == 'offset':
+        page = max(request.args.get('page', 1, type=int), 1)
+        total = count_rows(query, 'exact' if count_mode == 'none' else count_mode)
+        direction = asc if ascending else desc
+        items = query.order_by(direction(sort_column), direction(key_column)) \
+            .limit(limit).offset((page - 1) * limit).all()
+        list_page = ListPage('offset', items, limit, page=page, total=total,
+                             first_item=(page - 1) * limit + 1 if items else 0)
+        list_page.has_prev = page > 1
+        list_page.has_next = page < list_page.pages
+        return list_page
+
+    cursor = decode_cursor(request.args.get('cursor'))
+    total = count_rows(query, count_mode)
+    single_entity = len(query.column_descriptions) == 1
+    seek_query = query.add_columns(sort_column.label('seek_sort'), key_column.label('seek_key'))
+
+    def read(seek_values, reading_ascending):
+        reading = asc if reading_ascending else desc
+        page_query = seek_query
+        if seek_values is not None:
+            page_query = page_query.filter(_seek_condition(sort_column, key_column, *seek_values, reading_ascending))
+        rows = page_query.order_by(reading(sort_column), reading(key_column)).limit(limit + 1).all()
+        return rows[:limit], len(rows) > limit
+
+    backwards = bool(cursor) and cursor['d'] == 'prev'
+    # Walking backwards reads the same order reversed, then flips the rows back.
+    rows, has_more = read(cursor.get('v') if cursor else None, ascending != backwards)
+    if backwards:
+        rows.reverse()
+        if not has_more and len(rows) < limit:
+            # Walked back past the start: show a full first page instead of a short one.
+            cursor, backwards = None, False
+            rows, has_more = read(None, ascending)
+
+    offset = cursor.get('o') if cursor else 0
+    if backwards and not has_more:
+        offset = 0  # Back at the start, whatever the cursor said.
+    elif cursor and cursor.get('v') is None and total is not None:
+        offset = total - len(rows)  # The 'Last' link.
+
+    items = [row[0] if single_entity else tuple(row[:-2]) for row in rows]
+    list_page = ListPage('keyset', items, limit, total=total,
+                         first_item=offset + 1 if rows and offset is not None else None,
+                         has_prev=has_more if backwards else bool(cursor),
+                         has_next=cursor.get('v') is not None if backwards else has_more)
+    if rows:
+        first, last = rows[0], rows[-1]
+        next_offset = offset + len(rows) if offset is not None else None
+        prev_offset = max(offset - limit, 0) if offset is not None else None
+        list_page.next_cursor = encode_cursor({'d': 'next', 'v': [last[-2], last[-1]], 'o': next_offset})
+        list_page.prev_cursor = encode_cursor({'d': 'prev', 'v': [first[-2], first[-1]], 'o': prev_offset})
+    return list_page
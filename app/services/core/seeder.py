@@ -1,47 +1,97 @@
-import csv
 import os
-from .models import ClientInfo, Subscription, ResourceGroup
+import sys
+import uuid
+from datetime import datetime, timezone
+from .models import ClientInfo, DataVersion, Subscription, ResourceGroup
+from .bulk import BulkLoader, iter_csv_rows
 
-def seed_core_data(db, context):
-    """Seeds ClientInfo, Subscriptions, and Resource Groups."""
+SUBSCRIPTIONS_CSV = 'Subscriptions.csv'
+RESOURCE_GROUPS_CSV = 'Azureresourcegroups.csv'
+
+def resolve_resource_group_id(context, subscription_name, resource_group_name):
+    """
+    Looks up the resource group id for a CSV row using the id-only maps the
+    core seeder leaves in the context. Returns None if either is unknown.
+    """
+    sub_id = context.get('sub_map', {}).get(subscription_name.upper())
+    if not sub_id:
+        return None
+    rg_id_key = f"/subscriptions/{sub_id}/resourceGroups/{resource_group_name}".lower()
+    return context.get('rg_map', {}).get(rg_id_key)
+
+def seed_client_info(db, context):
+    """Creates or updates the single ClientInfo row for this report."""
     client_name = context.get('client_name')
     report_date = context.get('report_date')
     if client_name and report_date:
-        client_info = ClientInfo(name=client_name, report_date=report_date)
-        db.session.add(client_info)
-    
-    sub_map = {}
-    if os.path.exists('Subscriptions.csv'):
-        with open('Subscriptions.csv', 'r', encoding='utf-8-sig') as f:
-            if 'sep=' in f.readline().lower(): pass
-            else: f.seek(0)
-            reader = csv.DictReader(f)
-            for row in reader:
-                sub_id = row['SUBSCRIPTION ID']
-                sub = Subscription(id=sub_id, name=row['SUBSCRIPTION NAME'])
-                db.session.add(sub)
-                sub_map[sub.name.upper()] = sub
-        db.session.commit()
-        print(f"Seeded {len(sub_map)} subscriptions.")
+        client_info = ClientInfo.query.first()
+        if client_info:
+            client_info.name = client_name
+            client_info.report_date = report_date
+        else:
+            db.session.add(ClientInfo(name=client_name, report_date=report_date))
+        db.session.flush()
+
+def stamp_data_version(db):
+    """Records a new data version, so the web app drops everything it cached from the old data."""
+    seeded_at = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    data_version = db.session.get(DataVersion, 1)
+    if data_version:
+        data_version.version = uuid.uuid4().hex
+        data_version.seeded_at = seeded_at
     else:
-        print("Warning: Subscriptions.csv not found.")
+        db.session.add(DataVersion(id=1, version=uuid.uuid4().hex, seeded_at=seeded_at))
+    db.session.flush()
+
+def restore_core_context(db, context):
+    """
+    Rebuilds the id-only sub_map and rg_map from the database, for incremental
+    runs where the core CSVs are unchanged and seed_core_data is skipped.
+    """
+    context['sub_map'] = {name.upper(): sys.intern(sub_id)
+                          for sub_id, name in db.session.query(Subscription.id, Subscription.name)}
+    context['rg_map'] = {rg_id: rg_id for rg_id in
+                         (sys.intern(row[0]) for row in db.session.query(ResourceGroup.id))}
+
+def seed_core_data(db, context):
+    """Seeds Subscriptions and Resource Groups."""
+    incremental = context.get('incremental', False)
+
+    # The maps shared with later seeders hold interned id strings only, never
+    # ORM objects or row dicts, so they stay small for very large tenants.
+    # A missing CSV is loaded as an empty one, so an incremental run removes its rows.
+    sub_map = {}
+    if not os.path.exists(SUBSCRIPTIONS_CSV):
+        print(f"Warning: {SUBSCRIPTIONS_CSV} not found. Treating it as empty.")
+    with BulkLoader(db, Subscription, chunk_size=context.get('chunk_size'), label='subscriptions',
+                    incremental=incremental) as sub_loader:
+        for row in iter_csv_rows(SUBSCRIPTIONS_CSV) if os.path.exists(SUBSCRIPTIONS_CSV) else ():
+            sub_id = sys.intern(row['SUBSCRIPTION ID'])
+            sub_loader.add({'id': sub_id, 'name': row['SUBSCRIPTION NAME']})
+            sub_map[row['SUBSCRIPTION NAME'].upper()] = sub_id
+    print(f"Seeded {sub_loader.summary()}.")
     
     rg_map = {}
-    if os.path.exists('Azureresourcegroups.csv'):
-        with open('Azureresourcegroups.csv', 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                sub_obj = sub_map.get(row['SUBSCRIPTION'].upper())
-                if sub_obj:
-                    # FIX: Store all generated IDs and map keys in lowercase
-                    rg_id = f"/subscriptions/{sub_obj.id}/resourceGroups/{row['NAME']}".lower()
-                    rg = ResourceGroup(id=rg_id, name=row['NAME'], subscription_id=sub_obj.id)
-                    db.session.add(rg)
-                    rg_map[rg_id] = rg
-        db.session.commit()
-        print(f"Seeded {len(rg_map)} resource groups.")
-    else:
-        print("Warning: Azureresourcegroups.csv not found.")
+    if not os.path.exists(RESOURCE_GROUPS_CSV):
+        print(f"Warning: {RESOURCE_GROUPS_CSV} not found. Treating it as empty.")
+    with BulkLoader(db, ResourceGroup, chunk_size=context.get('chunk_size'), label='resource groups',
+                    incremental=incremental) as loader:
+        for row in iter_csv_rows(RESOURCE_GROUPS_CSV) if os.path.exists(RESOURCE_GROUPS_CSV) else ():
+            sub_id = sub_map.get(row['SUBSCRIPTION'].upper())
+            if sub_id:
+                # FIX: Store all generated IDs and map keys in lowercase
+                rg_id = sys.intern(f"/subscriptions/{sub_id}/resourceGroups/{row['NAME']}".lower())
+                loader.add({'id': rg_id, 'name': row['NAME'], 'subscription_id': sub_id})
+                rg_map[rg_id] = rg_id
+    print(f"Seeded {loader.summary()}.")
+    removed = loader.delete_missing()
+    if removed:
+        print(f"Removed {removed} resource groups no longer in the export.")
+
+    # Subscriptions are removed last, once no removed resource group refers to them.
+    removed = sub_loader.delete_missing()
+    if removed:
+        print(f"Removed {removed} subscriptions no longer in the export.")
 
     context['sub_map'] = sub_map
     context['rg_map'] = rg_map
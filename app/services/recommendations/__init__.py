@@ -1,12 +1,18 @@
-from .routes import recs_bp
-from .seeder import seed_recommendations
-
 SERVICE_CONFIG = {
     'KEY': 'recommendations',
     'NAME': 'Recommendations',
-    'BLUEPRINT': recs_bp,
+    'BLUEPRINT': '.routes:recs_bp',
     'MODEL_MODULES': ['.services.recommendations.models'],
-    'SEEDER_FUNC': seed_recommendations,
+    'SEEDER_FUNC': '.seeder:seed_recommendations',
+    # Parses the CSV in a worker process; only SEEDER_FUNC touches the database.
+    'PARSER_FUNC': '.seeder:iter_recommendations',
+    'DEPENDS_ON': ['core'],
+    # Runs once every service is seeded, since the rollups cover all resources.
+    'POST_SEED_FUNC': '.seeder:refresh_recommendation_rollups',
+    # Totals for the dashboard, stored in the KPI snapshot by every seeder run.
+    'KPI_FUNC': '.seeder:compute_recommendation_kpis',
     'CSV_FILE': None, 
+    # Placeholders are filled from the seeder context; the Advisor file name changes with every export.
+    'CSV_FILES': ['{advisor_csv_file}'],
     'SHOW_IN_NAV': False,
 }
\ No newline at end of file
@@ -1,4 +1,5 @@
 from app.db import db
+from sqlalchemy import func
 from sqlalchemy.orm import relationship
 
 class RecommendationType(db.Model):
@@ -6,8 +7,8 @@ class RecommendationType(db.Model):
     __tablename__ = 'recommendation_types'
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.String, unique=True)
-    category = db.Column(db.String)
-    impact = db.Column(db.String)
+    category = db.Column(db.String, index=True)
+    impact = db.Column(db.String, index=True)
     
     # This relationship expects to find a 'recommendation_type' property on the RecommendationInstance model.
     instances = relationship("RecommendationInstance", back_populates="recommendation_type", cascade="all, delete-orphan")
@@ -17,7 +18,10 @@ class RecommendationInstance(db.Model):
     __tablename__ = 'recommendation_instances'
     id = db.Column(db.Integer, primary_key=True)
     recommendation_type_id = db.Column(db.Integer, db.ForeignKey('recommendation_types.id'), nullable=False)
-    potential_savings = db.Column(db.Float)
+    potential_savings = db.Column(db.Float, index=True)
+    # Copied from the type by the seeder, so the list's default sort, by impact,
+    # is read from an index instead of sorting every instance.
+    impact = db.Column(db.String)
     
     resource_id = db.Column(db.String, db.ForeignKey('resources.id'), nullable=True)
     resource = relationship("Resource", back_populates="recommendations")
@@ -25,3 +29,54 @@ class RecommendationInstance(db.Model):
     # FIX: Added the missing relationship back to RecommendationType.
     # This is the property that SQLAlchemy was looking for.
     recommendation_type = relationship("RecommendationType", back_populates="instances")
+
+    # The natural key of an instance, used to upsert recommendations on incremental re-seeds.
+    # It also serves lookups by resource_id, as its leading column.
+    __table_args__ = (
+        db.Index('ix_recommendation_instances_resource_type', 'resource_id', 'recommendation_type_id', unique=True),
+        # Joins from a filtered set of types; covers the savings column for aggregates.
+        db.Index('ix_recommendation_instances_type_savings', 'recommendation_type_id', 'potential_savings'),
+        # The list page order: impact, then newest first.
+        db.Index('ix_recommendation_instances_impact', 'impact', 'id'),
+    )
+
+# Used by the case-insensitive impact/category filters in recommendations_list
+# and the /api/data/impact-by-category endpoint.
+db.Index('ix_recommendation_types_lower_impact', func.lower(RecommendationType.impact))
+db.Index('ix_recommendation_types_lower_category', func.lower(RecommendationType.category))
+# The impact filter of recommendations_list, still in the page order.
+db.Index('ix_recommendation_instances_lower_impact', func.lower(RecommendationInstance.impact),
+         RecommendationInstance.impact, RecommendationInstance.id)
+
+# Impacts and categories Advisor reports, and the rollup column counting each.
+ROLLUP_IMPACT_COLUMNS = {
+    'high': 'high_impact_count',
+    'medium': 'medium_impact_count',
+    'low': 'low_impact_count',
+}
+ROLLUP_CATEGORY_COLUMNS = {
+    'cost': 'cost_count',
+    'security': 'security_count',
+    'reliability': 'reliability_count',
+    'performance': 'performance_count',
+    'operational excellence': 'operational_excellence_count',
+}
+
+class RecommendationRollup(db.Model):
+    """
+    Per-resource recommendation totals, rebuilt by the seeder after every run
+    so the resource list pages can join and sort on them instead of grouping
+    recommendation_instances on each request. Every resource has a row.
+    """
+    __tablename__ = 'recommendation_rollups'
+    resource_id = db.Column(db.String, db.ForeignKey('resources.id'), primary_key=True)
+    recommendation_count = db.Column(db.Integer, nullable=False, default=0, index=True)
+    potential_savings = db.Column(db.Float, nullable=False, default=0.0, index=True)
+    high_impact_count = db.Column(db.Integer, nullable=False, default=0)
+    medium_impact_count = db.Column(db.Integer, nullable=False, default=0)
+    low_impact_count = db.Column(db.Integer, nullable=False, default=0)
+    cost_count = db.Column(db.Integer, nullable=False, default=0)
+    security_count = db.Column(db.Integer, nullable=False, default=0)
+    reliability_count = db.Column(db.Integer, nullable=False, default=0)
+    performance_count = db.Column(db.Integer, nullable=False, default=0)
+    operational_excellence_count = db.Column(db.Integer, nullable=False, default=0)
@@ -1,22 +1,18 @@
 from flask import Blueprint, render_template, request, current_app
-from sqlalchemy import func, desc, asc
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager
 from app.db import db
 from .models import RecommendationInstance, RecommendationType
 from app.services.core.models import Resource, ResourceGroup, Subscription
+from app.services.core.facets import compute_facets
+from app.services.core.export import stream_export
+from app.services.core.pagination import paginate_list
 
 recs_bp = Blueprint('recs', __name__, url_prefix='/recommendations')
 ALLOWED_LIMITS = [10, 25, 50, 100]
 
-def get_distinct_values(query, model, column_name):
-    """Helper to get distinct values from the current query context."""
-    return [row[0] for row in query.with_entities(getattr(model, column_name)).distinct().filter(getattr(model, column_name).isnot(None)).order_by(getattr(model, column_name)).all()]
-
-@recs_bp.route('/')
-def recommendations_list():
-    page = request.args.get('page', 1, type=int)
-    limit = request.args.get('limit', 25, type=int)
-    if limit not in ALLOWED_LIMITS: limit = 25
-    
+def build_list_query():
+    """Applies the filter and sort arguments of the request. Shared by the list page and its export."""
     sort_by = request.args.get('sort_by', 'impact')
     sort_order = request.args.get('sort_order', 'desc')
     
@@ -24,7 +20,7 @@ def recommendations_list():
     base_query = db.session.query(RecommendationInstance).join(RecommendationType).outerjoin(Resource).outerjoin(ResourceGroup).outerjoin(Subscription)
     
     filter_map = {
-        'impact': (RecommendationType, 'impact'),
+        'impact': (RecommendationInstance, 'impact'),
         'subscription_name': (Subscription, 'name'),
         'resource_group_name': (ResourceGroup, 'name'),
         'resource_type': (Resource, 'type'),
@@ -41,27 +37,46 @@ def recommendations_list():
             active_filters[key] = values_list
             column = getattr(model, col_name)
             base_query = base_query.filter(func.lower(column).in_([v.lower() for v in values_list]))
-        
-    title_parts = []
-    if active_filters.get('impact'): title_parts.append(f"{active_filters['impact'][0].title()} Impact")
-    if active_filters.get('category'): title_parts.append(f"{active_filters['category'][0].title()}")
-    if active_filters.get('subscription_name'): title_parts.append(f"for {active_filters['subscription_name'][0]}")
-    page_title = " ".join(title_parts) + " Recommendations" if title_parts else "All Recommendations"
 
+    # Search results link here to list the resources with one recommendation.
+    recommendation_type_id = request.args.get('type', type=int)
+    if recommendation_type_id:
+        base_query = base_query.filter(RecommendationInstance.recommendation_type_id == recommendation_type_id)
+        
     sort_column_map = {
         'resource_name': Resource.name,
-        'impact': RecommendationType.impact,
+        'impact': RecommendationInstance.impact,
         'resource_type': Resource.type,
         'subscription_name': Subscription.name,
         'resource_group_name': ResourceGroup.name,
         'potential_savings': RecommendationInstance.potential_savings,
     }
-    sort_column = sort_column_map.get(sort_by, RecommendationType.impact)
+    sort_column = sort_column_map.get(sort_by, RecommendationInstance.impact)
     
-    order_logic = desc(sort_column) if sort_order == 'desc' else asc(sort_column)
-    final_query = base_query.order_by(order_logic)
+    # The page query already joins everything a row shows, so populate the
+    # relationships from it instead of lazy loading them row by row.
+    final_query = base_query.options(
+        contains_eager(RecommendationInstance.recommendation_type),
+        contains_eager(RecommendationInstance.resource)
+            .contains_eager(Resource.resource_group)
+            .contains_eager(ResourceGroup.subscription)
+    )
+    return base_query, final_query, sort_column, sort_by, sort_order, active_filters
+
+@recs_bp.route('/')
+def recommendations_list():
+    limit = request.args.get('limit', 25, type=int)
+    if limit not in ALLOWED_LIMITS: limit = 25
     
-    paginated_results = final_query.paginate(page=page, per_page=limit, error_out=False)
+    base_query, final_query, sort_column, sort_by, sort_order, active_filters = build_list_query()
+
+    title_parts = []
+    if active_filters.get('impact'): title_parts.append(f"{active_filters['impact'][0].title()} Impact")
+    if active_filters.get('category'): title_parts.append(f"{active_filters['category'][0].title()}")
+    if active_filters.get('subscription_name'): title_parts.append(f"for {active_filters['subscription_name'][0]}")
+    page_title = " ".join(title_parts) + " Recommendations" if title_parts else "All Recommendations"
+
+    paginated_results = paginate_list(final_query, sort_column, sort_order, RecommendationInstance.id, limit)
 
     headers = [
         {'label': 'Resource Name', 'key': 'resource_name', 'sortable': True, 'is_link': True, 'filterable': False},
@@ -86,12 +101,13 @@ def recommendations_list():
             'potential_savings': rec.potential_savings,
         })
 
-    filter_data = {
-        'impact': get_distinct_values(base_query, RecommendationType, 'impact'),
-        'subscription_name': get_distinct_values(base_query, Subscription, 'name'),
-        'resource_group_name': get_distinct_values(base_query, ResourceGroup, 'name'),
-        'resource_type': get_distinct_values(base_query, Resource, 'type'),
-    }
+    # Options and row counts for every filter dropdown, in one query.
+    filter_data = compute_facets(base_query, {
+        'impact': RecommendationInstance.impact,
+        'subscription_name': Subscription.name,
+        'resource_group_name': ResourceGroup.name,
+        'resource_type': Resource.type,
+    })
 
     # FIX: Dynamically build the detail route map from all service configurations and pass it to the template.
     detail_routes = {
@@ -104,5 +120,21 @@ def recommendations_list():
                            headers=headers, rows=rows, page_title=page_title,
                            filter_data=filter_data, active_filters=active_filters,
                            detail_routes=detail_routes,
-                           page=page, total_pages=paginated_results.pages, total_items=paginated_results.total, 
-                           limit=limit, sort_by=sort_by, sort_order=sort_order)
+                           pagination=paginated_results, limit=limit, sort_by=sort_by, sort_order=sort_order)
+
+@recs_bp.route('/export/<fmt>')
+def recommendations_export(fmt):
+    # Exports select plain columns, so they start from the query without the eager loads.
+    base_query, _, sort_column, _, sort_order, _ = build_list_query()
+    columns = [
+        ('Resource Name', Resource.name),
+        ('Resource Type', Resource.type),
+        ('Impact', RecommendationType.impact),
+        ('Category', RecommendationType.category),
+        ('Recommendation', RecommendationType.text),
+        ('Subscription', Subscription.name),
+        ('Resource Group', ResourceGroup.name),
+        ('Potential Savings', RecommendationInstance.potential_savings),
+        ('Resource ID', RecommendationInstance.resource_id),
+    ]
+    return stream_export(base_query, sort_column, sort_order, RecommendationInstance.id, columns, fmt, 'recommendations')
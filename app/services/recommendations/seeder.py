@@ -1,6 +1,9 @@
-import csv
 import os
-from .models import RecommendationType, RecommendationInstance
+from sqlalchemy import case, delete, exists, func, insert, select
+from app.services.core.models import Resource
+from .models import (RecommendationType, RecommendationInstance, RecommendationRollup,
+                     ROLLUP_IMPACT_COLUMNS, ROLLUP_CATEGORY_COLUMNS)
+from app.services.core.bulk import BulkLoader, iter_csv_rows
 
 def get_provider_namespace(resource_type):
     """
@@ -17,72 +20,173 @@ def get_provider_namespace(resource_type):
     }
     return mapping.get(resource_type.lower())
 
-def seed_recommendations(db, context, advisor_csv_file):
-    """Seeds recommendation data and links it to existing resources."""
+def iter_recommendations(context, stats):
+    """
+    Yields normalized recommendation rows from the Advisor CSV, each carrying
+    the constructed resource id. Rows that cannot be linked to a resource are
+    counted in stats['skipped'].
+    """
+    advisor_csv_file = context.get('advisor_csv_file')
     if not advisor_csv_file or not os.path.exists(advisor_csv_file):
-        print("Error: Advisor CSV file not found. Skipping recommendations.")
         return
+    for row in iter_csv_rows(advisor_csv_file):
+        # Filter for redundant subscription-level cost recommendations
+        if row['Type'] == 'Subscription' and row['Category'] == 'Cost':
+            stats['skipped'] += 1
+            continue
+
+        # --- FIX: Build the Resource ID from the row data ---
+        subscription_id = row.get('Subscription ID')
+        resource_group = row.get('Resource Group')
+        resource_name = row.get('Resource Name')
+        resource_type = row.get('Type')
+
+        # If any of the essential parts are missing, we can't build the ID.
+        if not all([subscription_id, resource_group, resource_name, resource_type]):
+            stats['skipped'] += 1
+            continue
+        
+        provider_namespace = get_provider_namespace(resource_type)
+        
+        # If we don't know how to map this resource type, skip it for now.
+        if not provider_namespace:
+            stats['skipped'] += 1
+            continue
+
+        # Construct the full, lowercase Azure Resource ID
+        resource_id = (
+            f"/subscriptions/{subscription_id}"
+            f"/resourceGroups/{resource_group}"
+            f"/providers/{provider_namespace}"
+            f"/{resource_name}"
+        ).lower()
+
+        savings_str = (row.get('Potential Annual Cost Savings') or '0').replace(',', '')
+        savings = float(savings_str) if savings_str else 0.0
+
+        yield {
+            'text': row['Recommendation'],
+            'category': row['Category'],
+            'impact': row['Business Impact'],
+            'resource_id': resource_id,
+            'potential_savings': savings,
+        }
+
+def seed_recommendations(db, context, rows=None, stats=None):
+    """
+    Seeds recommendation data from the Advisor CSV named in the context, or from
+    rows already parsed by the seeder's worker pool, and links it to resources.
+    """
+    advisor_csv_file = context.get('advisor_csv_file')
+    if not advisor_csv_file or not os.path.exists(advisor_csv_file):
+        print("Warning: Advisor CSV file not found. Treating it as empty.")
+
+    if rows is None:
+        stats = {'skipped': 0}
+        rows = iter_recommendations(context, stats)
     
+    # Recommendation type ids are assigned here rather than by the database, so
+    # instances can reference a new type without a flush() round trip. Types
+    # already in the database keep their ids across incremental re-seeds.
+    existing_type_ids = dict(db.session.query(RecommendationType.text, RecommendationType.id).all())
+    next_type_id = max(existing_type_ids.values(), default=0) + 1
     rec_type_map = {}
-    rec_count, skipped_count = 0, 0
-    with open(advisor_csv_file, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        
-        for row in reader:
-            # Filter for redundant subscription-level cost recommendations
-            if row['Type'] == 'Subscription' and row['Category'] == 'Cost':
-                skipped_count += 1
-                continue
-
-            # --- FIX: Build the Resource ID from the row data ---
-            subscription_id = row.get('Subscription ID')
-            resource_group = row.get('Resource Group')
-            resource_name = row.get('Resource Name')
-            resource_type = row.get('Type')
-
-            # If any of the essential parts are missing, we can't build the ID.
-            if not all([subscription_id, resource_group, resource_name, resource_type]):
-                skipped_count += 1
-                continue
-            
-            provider_namespace = get_provider_namespace(resource_type)
-            
-            # If we don't know how to map this resource type, skip it for now.
-            if not provider_namespace:
-                skipped_count += 1
-                continue
-
-            # Construct the full, lowercase Azure Resource ID
-            resource_id = (
-                f"/subscriptions/{subscription_id}"
-                f"/resourceGroups/{resource_group}"
-                f"/providers/{provider_namespace}"
-                f"/{resource_name}"
-            ).lower()
-
-
-            # --- Seed the recommendation type ---
-            rec_text = row['Recommendation']
-            rec_type = rec_type_map.get(rec_text)
-            if not rec_type:
-                rec_type = RecommendationType(text=rec_text, category=row['Category'], impact=row['Business Impact'])
-                db.session.add(rec_type)
-                db.session.flush() 
-                rec_type_map[rec_text] = rec_type
-            
-            savings_str = row.get('Potential Annual Cost Savings', '0').replace(',', '')
-            savings = float(savings_str) if savings_str else 0.0
-            
-            # --- Seed the recommendation instance with the constructed ID ---
-            rec_instance = RecommendationInstance(
-                recommendation_type_id=rec_type.id, 
-                resource_id=resource_id,
-                potential_savings=savings
-            )
-            db.session.add(rec_instance)
-            rec_count += 1
+    chunk_size = context.get('chunk_size')
+    incremental = context.get('incremental', False)
+    type_loader = BulkLoader(db, RecommendationType, chunk_size=chunk_size, label='recommendation types',
+                             incremental=incremental)
+    # Instances are keyed by resource and recommendation. Advisor can list the
+    # same recommendation for a resource more than once, e.g. reservations of
+    # different terms; those rows are stored as one instance whose savings are
+    # the sum of theirs.
+    loader = BulkLoader(db, RecommendationInstance, chunk_size=chunk_size, label='recommendation instances',
+                        parents=[type_loader], key_columns=('resource_id', 'recommendation_type_id'),
+                        upsert=True, incremental=incremental, accumulate=('potential_savings',))
+
+    for rec in rows:
+        # --- Seed the recommendation type ---
+        rec_type_id = rec_type_map.get(rec['text'])
+        if not rec_type_id:
+            rec_type_id = existing_type_ids.get(rec['text'])
+            if not rec_type_id:
+                rec_type_id = next_type_id
+                next_type_id += 1
+            type_loader.add({'id': rec_type_id, 'text': rec['text'], 'category': rec['category'], 'impact': rec['impact']})
+            rec_type_map[rec['text']] = rec_type_id
+
+        # --- Seed the recommendation instance with the constructed ID ---
+        loader.add({
+            'recommendation_type_id': rec_type_id,
+            'resource_id': rec['resource_id'],
+            'potential_savings': rec['potential_savings'],
+            'impact': rec['impact'],
+        })
     
-    db.session.commit()
-    print(f"Seeded {rec_count} recommendation instances.")
-    if skipped_count > 0:
-        print(f"Skipped {skipped_count} unlinked or un-mappable recommendations.")
+    loader.close()
+    type_loader.close()
+    print(f"Seeded {type_loader.summary()}.")
+    print(f"Seeded {loader.summary()}.")
+    if stats['skipped'] > 0:
+        print(f"Skipped {stats['skipped']} unlinked or un-mappable recommendations.")
+    # Instances go first so no removed type is still referenced.
+    removed_recs = loader.delete_missing()
+    removed_types = type_loader.delete_missing()
+    if removed_recs or removed_types:
+        print(f"Removed {removed_recs} recommendation instances and {removed_types} types no longer in the export.")
+
+def refresh_recommendation_rollups(db, context):
+    """
+    Rebuilds the per-resource rollup table from the current resources and
+    recommendation instances, inside the seeder's transaction, and reports
+    the instances whose resource is in none of the resource exports.
+    """
+    def count_matching(column, value):
+        return func.coalesce(func.sum(case((func.lower(column) == value, 1), else_=0)), 0)
+
+    columns = {
+        'resource_id': Resource.id,
+        'recommendation_count': func.count(RecommendationInstance.id),
+        'potential_savings': func.coalesce(func.sum(RecommendationInstance.potential_savings), 0.0),
+    }
+    for impact, column_name in ROLLUP_IMPACT_COLUMNS.items():
+        columns[column_name] = count_matching(RecommendationType.impact, impact)
+    for category, column_name in ROLLUP_CATEGORY_COLUMNS.items():
+        columns[column_name] = count_matching(RecommendationType.category, category)
+
+    rollup_query = select(*columns.values()) \
+        .select_from(Resource) \
+        .outerjoin(RecommendationInstance, RecommendationInstance.resource_id == Resource.id) \
+        .outerjoin(RecommendationType, RecommendationType.id == RecommendationInstance.recommendation_type_id) \
+        .group_by(Resource.id)
+
+    db.session.execute(delete(RecommendationRollup))
+    result = db.session.execute(insert(RecommendationRollup).from_select(list(columns), rollup_query))
+    print(f"Rebuilt recommendation rollups for {result.rowcount} resources.")
+
+    # Kept, since the recommendation still applies; the list shows its resource as not imported.
+    unlinked = db.session.query(func.count(RecommendationInstance.id)).filter(
+        ~exists().where(Resource.id == RecommendationInstance.resource_id)).scalar()
+    if unlinked:
+        print(f"{unlinked} recommendations refer to resources missing from the resource exports.")
+
+def compute_recommendation_kpis(db):
+    """
+    The recommendation totals shown on the dashboard: the instance count and
+    savings, and the counts by impact and by category as [label, count]
+    pairs in chart order.
+    """
+    total, savings = db.session.query(
+        func.count(RecommendationInstance.id), func.coalesce(func.sum(RecommendationInstance.potential_savings), 0.0)
+    ).one()
+    categories = db.session.query(
+        RecommendationType.category, func.count(RecommendationInstance.id)
+    ).join(RecommendationInstance).group_by(RecommendationType.category).order_by(func.count(RecommendationInstance.id).desc()).all()
+    impacts = db.session.query(
+        RecommendationType.impact, func.count(RecommendationInstance.id)
+    ).join(RecommendationInstance).group_by(RecommendationType.impact).all()
+    return {
+        'total': total,
+        'potential_savings': savings,
+        'categories': [list(row) for row in categories],
+        'impacts': [list(row) for row in impacts],
+    }
@@ -0,0 +1,130 @@
+import importlib
+import json
+import os
+import time
+from importlib.metadata import entry_points
+
+SERVICES_DIR = os.path.dirname(__file__)
+# Optional list of service packages to load instead of scanning SERVICES_DIR,
+# e.g. {"services": ["app.services.core", "app.services.virtual_machines"]}.
+MANIFEST_FILE = os.path.join(SERVICES_DIR, 'manifest.json')
+MANIFEST_ENV = 'AZUREREPORT_SERVICES_MANIFEST'
+# Installed packages can add services with an entry point in this group,
+# pointing at the module that defines SERVICE_CONFIG.
+ENTRY_POINT_GROUP = 'azurereport.services'
+
+# SERVICE_CONFIG values that may be given as 'module:attribute' strings, relative
+# to the service package, and are only imported when first used.
+LAZY_KEYS = ('BLUEPRINT', 'SEEDER_FUNC', 'PARSER_FUNC', 'RESTORE_FUNC', 'POST_SEED_FUNC', 'KPI_FUNC')
+
+_registry = None
+
+class ServiceRegistry:
+    """
+    The service plugins of this process. Found once, then shared by every
+    create_app() call and the seeder. Model modules are imported with the
+    app; routes and seeders are imported when first asked for, so the web
+    app never loads the seeders and the seeder never loads the routes.
+    """
+
+    def __init__(self, manifest=None):
+        self.manifest = manifest
+        self.configs = []
+        self.packages = {}  # KEY -> service package name
+        self.timings = {}  # KEY -> {step: seconds}
+        self.discovery_seconds = None
+        self._models_loaded = set()
+        self._routes_ready = set()
+
+    def discover(self):
+        started = time.perf_counter()
+        for module_name in self._module_names():
+            step_started = time.perf_counter()
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError as e:
+                print(f"Could not import service {module_name}: {e}")
+                continue
+            config = getattr(module, 'SERVICE_CONFIG', None)
+            if config is None:
+                continue
+            self.configs.append(config)
+            self.packages[config['KEY']] = module.__name__
+            self._record(config, 'config', time.perf_counter() - step_started)
+        self.discovery_seconds = time.perf_counter() - started
+        return self
+
+    def _module_names(self):
+        manifest = self.manifest or os.environ.get(MANIFEST_ENV) or MANIFEST_FILE
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                names = json.load(f)['services']
+        else:
+            names = [f"app.services.{name}" for name in sorted(os.listdir(SERVICES_DIR))
+                     if os.path.isfile(os.path.join(SERVICES_DIR, name, '__init__.py'))]
+        names += [ep.value for ep in entry_points(group=ENTRY_POINT_GROUP) if ep.value not in names]
+        return names
+
+    def _record(self, config, step, seconds):
+        steps = self.timings.setdefault(config['KEY'], {})
+        steps[step] = steps.get(step, 0.0) + seconds
+
+    def resolve(self, config, key):
+        """
+        The value of a SERVICE_CONFIG key, importing it first if it is a
+        'module:attribute' reference. The imported object replaces the
+        reference, so each one is imported once per process.
+        """
+        value = config.get(key)
+        if key not in LAZY_KEYS or not isinstance(value, str):
+            return value
+        started = time.perf_counter()
+        module_name, _, attribute = value.partition(':')
+        module = importlib.import_module(module_name, package=self.packages.get(config['KEY']))
+        config[key] = value = getattr(module, attribute)
+        self._record(config, 'routes' if key == 'BLUEPRINT' else 'seeder', time.perf_counter() - started)
+        return value
+
+    def load_models(self, config):
+        """Imports the service's MODEL_MODULES, so SQLAlchemy knows its tables."""
+        if config['KEY'] in self._models_loaded:
+            return
+        started = time.perf_counter()
+        for model_module in config.get('MODEL_MODULES', []):
+            importlib.import_module(model_module, package='app')
+        self._models_loaded.add(config['KEY'])
+        self._record(config, 'models', time.perf_counter() - started)
+
+    def blueprint(self, config):
+        """The service blueprint, with its list routes added from LIST_SPEC the first time."""
+        blueprint = self.resolve(config, 'BLUEPRINT')
+        if config.get('LIST_SPEC') and config['KEY'] not in self._routes_ready:
+            started = time.perf_counter()
+            from app.services.core.list_engine import register_list_routes
+            register_list_routes(config)
+            self._record(config, 'routes', time.perf_counter() - started)
+        self._routes_ready.add(config['KEY'])
+        return blueprint
+
+    def report(self):
+        """Printable lines with the time spent loading each service, slowest first."""
+        steps = ('config', 'models', 'routes', 'seeder')
+        lines = [f"{'total':>9} " + ' '.join(f"{step:>9}" for step in steps) + "  service (ms)"]
+        totals = sorted(((sum(t.values()), key, t) for key, t in self.timings.items()), reverse=True)
+        for total, key, t in totals:
+            lines.append(f"{total * 1000:>9.1f} " + ' '.join(f"{t.get(step, 0.0) * 1000:>9.1f}" for step in steps) + f"  {key}")
+        lines.append(f"Discovery: {self.discovery_seconds * 1000:.1f} ms for {len(self.configs)} services.")
+        return lines
+
+def get_registry():
+    """The registry of this process, discovering the services on first use."""
+    global _registry
+    if _registry is None:
+        _registry = ServiceRegistry().discover()
+    return _registry
+
+def get_service_configs():
+    return get_registry().configs
+
+def resolve(config, key):
+    return get_registry().resolve(config, key)
@@ -1,17 +1,26 @@
-from .routes import storage_bp
-from .seeder import seed_storage_accounts
-
 SERVICE_CONFIG = {
     'KEY': 'storage_accounts',
     'NAME': 'Storage Accounts',
-    'BLUEPRINT': storage_bp,
+    'BLUEPRINT': '.routes:storage_bp',
     'MODEL_MODULES': ['.services.storage_accounts.models'],
     # FIX: Add the correct model class name
     'MODEL_CLASS_NAME': 'StorageAccount',
-    'SEEDER_FUNC': seed_storage_accounts,
+    'SEEDER_FUNC': '.seeder:seed_storage_accounts',
+    # Parses the CSV in a worker process; only SEEDER_FUNC touches the database.
+    'PARSER_FUNC': '.seeder:iter_storage_accounts',
+    'DEPENDS_ON': ['core'],
     'CSV_FILE': 'AzureStorageAccounts.csv',
     'SHOW_IN_NAV': True,
     'NAV_ORDER': 3,
     'LIST_ROUTE': 'storage.storage_accounts_list',
-    'DETAIL_ROUTE': 'storage.storage_account_detail'
-}
\ No newline at end of file
+    'DETAIL_ROUTE': 'storage.storage_account_detail',
+    'LIST_SPEC': {
+        'EXPORT_NAME': 'storage-accounts',
+        'COLUMNS': [
+            {'label': 'Location', 'key': 'location', 'sortable': True, 'filterable': True},
+            {'label': 'SKU', 'key': 'sku', 'sortable': True, 'filterable': True},
+            {'label': 'Kind', 'key': 'kind', 'sortable': True, 'filterable': True},
+        ],
+    },
+    'RESOURCE_TYPE': 'Storage account' # Must match the polymorphic_identity
+}
@@ -5,6 +5,6 @@ from app.services.core.models import Resource
 class StorageAccount(Resource):
     __tablename__ = 'storage_accounts'
     id = db.Column(db.String, db.ForeignKey('resources.id'), primary_key=True)
-    sku = db.Column(db.String)
-    kind = db.Column(db.String)
+    sku = db.Column(db.String, index=True)
+    kind = db.Column(db.String, index=True)
     __mapper_args__ = {'polymorphic_identity': 'Storage account'}
\ No newline at end of file
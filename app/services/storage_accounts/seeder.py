@@ -1,36 +1,40 @@
-import csv
 import os
 from .models import StorageAccount
+from app.services.core.bulk import BulkLoader, iter_csv_rows
+from app.services.core.seeder import resolve_resource_group_id
 
-def seed_storage_accounts(db, context):
-    """Seeds storage account data from its CSV file."""
-    STORAGE_ACCOUNTS_CSV = 'AzureStorageAccounts.csv'
+STORAGE_ACCOUNTS_CSV = 'AzureStorageAccounts.csv'
+
+def iter_storage_accounts(context, stats):
+    """Yields normalized storage account rows from the CSV, resolved against the core id maps."""
     if not os.path.exists(STORAGE_ACCOUNTS_CSV):
-        print(f"Warning: {STORAGE_ACCOUNTS_CSV} not found. Skipping Storage Account seeding.")
         return
+    for row in iter_csv_rows(STORAGE_ACCOUNTS_CSV):
+        rg_id = resolve_resource_group_id(context, row['SUBSCRIPTION'], row['RESOURCE GROUP'])
+        if not rg_id:
+            stats['skipped'] += 1
+            continue
+        # FIX: Create resource ID in lowercase
+        yield {
+            'id': f"{rg_id}/providers/microsoft.storage/storageaccounts/{row['NAME']}".lower(),
+            'name': row['NAME'], 'type': 'Storage account', 'location': row['LOCATION'],
+            'resource_group_id': rg_id, 'sku': row['TYPE'], 'kind': row['KIND']
+        }
 
-    storage_map = {}
-    rg_map = context.get('rg_map', {})
-    sub_map = context.get('sub_map', {})
-
-    with open(STORAGE_ACCOUNTS_CSV, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            sub_obj = sub_map.get(row['SUBSCRIPTION'].upper())
-            if sub_obj:
-                # FIX: Use lowercase for lookup key
-                rg_id_key = f"/subscriptions/{sub_obj.id}/resourceGroups/{row['RESOURCE GROUP']}".lower()
-                rg_obj = rg_map.get(rg_id_key)
-                if rg_obj:
-                    # FIX: Create resource ID in lowercase
-                    sa_id = f"{rg_obj.id}/providers/microsoft.storage/storageaccounts/{row['NAME']}".lower()
-                    sa = StorageAccount(
-                        id=sa_id, name=row['NAME'], type='Storage account', location=row['LOCATION'],
-                        resource_group_id=rg_obj.id, sku=row['TYPE'], kind=row['KIND']
-                    )
-                    db.session.add(sa)
-                    storage_map[sa_id] = sa
+def seed_storage_accounts(db, context, rows=None, stats=None):
+    """Seeds storage account data from its CSV file, or from rows already parsed by the seeder's worker pool."""
+    if not os.path.exists(STORAGE_ACCOUNTS_CSV):
+        print(f"Warning: {STORAGE_ACCOUNTS_CSV} not found. Treating it as empty.")
 
-    db.session.commit()
-    print(f"Seeded {len(storage_map)} Storage Accounts.")
-    context['storage_map'] = storage_map
+    if rows is None:
+        stats = {'skipped': 0}
+        rows = iter_storage_accounts(context, stats)
+    with BulkLoader(db, StorageAccount, chunk_size=context.get('chunk_size'), label='Storage Accounts',
+                    incremental=context.get('incremental', False)) as loader:
+        loader.add_many(rows)
+    print(f"Seeded {loader.summary()}.")
+    if stats['skipped'] > 0:
+        print(f"Skipped {stats['skipped']} rows with an unknown subscription or resource group.")
+    removed = loader.delete_missing()
+    if removed:
+        print(f"Removed {removed} Storage Accounts no longer in the export.")
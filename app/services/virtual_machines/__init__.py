@@ -1,17 +1,27 @@
-from .routes import vms_bp
-from .seeder import seed_vms
-
 SERVICE_CONFIG = {
     'KEY': 'virtual_machines',
     'NAME': 'Virtual Machines',
-    'BLUEPRINT': vms_bp,
+    'BLUEPRINT': '.routes:vms_bp',
     'MODEL_MODULES': ['.services.virtual_machines.models'],
     # FIX: Add the correct model class name
     'MODEL_CLASS_NAME': 'VM',
-    'SEEDER_FUNC': seed_vms,
+    'SEEDER_FUNC': '.seeder:seed_vms',
+    # Parses the CSV in a worker process; only SEEDER_FUNC touches the database.
+    'PARSER_FUNC': '.seeder:iter_vms',
+    'DEPENDS_ON': ['core'],
     'CSV_FILE': 'AzureVirtualMachines.csv',
     'SHOW_IN_NAV': True,
     'NAV_ORDER': 1,
     'LIST_ROUTE': 'vms.vms_list',
-    'DETAIL_ROUTE': 'vms.vm_detail'
-}
\ No newline at end of file
+    'DETAIL_ROUTE': 'vms.vm_detail',
+    'LIST_SPEC': {
+        'EXPORT_NAME': 'virtual-machines',
+        # Columns between Name/Subscription/Resource Group and the recommendation totals.
+        'COLUMNS': [
+            {'label': 'OS', 'key': 'os', 'sortable': True, 'filterable': True},
+            {'label': 'Size', 'key': 'size', 'sortable': True, 'filterable': True},
+            {'label': 'Status', 'key': 'status', 'sortable': True, 'filterable': True},
+        ],
+    },
+    'RESOURCE_TYPE': 'Virtual machine' # Must match the polymorphic_identity
+}
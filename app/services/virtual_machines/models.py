@@ -5,9 +5,9 @@ from app.services.core.models import Resource
 class VM(Resource):
     __tablename__ = 'vms'
     id = db.Column(db.String, db.ForeignKey('resources.id'), primary_key=True)
-    status = db.Column(db.String)
-    os = db.Column(db.String)
-    size = db.Column(db.String)
+    status = db.Column(db.String, index=True)
+    os = db.Column(db.String, index=True)
+    size = db.Column(db.String, index=True)
     public_ip = db.Column(db.String)
     disks = db.Column(db.Integer)
     __mapper_args__ = {'polymorphic_identity': 'Virtual machine'}
\ No newline at end of file
@@ -1,37 +1,41 @@
-import csv
 import os
 from .models import VM
+from app.services.core.bulk import BulkLoader, iter_csv_rows
+from app.services.core.seeder import resolve_resource_group_id
 
-def seed_vms(db, context):
-    """Seeds virtual machine data from its CSV file."""
-    VMS_CSV = 'AzureVirtualMachines.csv'
+VMS_CSV = 'AzureVirtualMachines.csv'
+
+def iter_vms(context, stats):
+    """Yields normalized VM rows from the CSV, resolved against the core id maps."""
     if not os.path.exists(VMS_CSV):
-        print(f"Warning: {VMS_CSV} not found. Skipping VM seeding.")
         return
+    for row in iter_csv_rows(VMS_CSV):
+        rg_id = resolve_resource_group_id(context, row['SUBSCRIPTION'], row['RESOURCE GROUP'])
+        if not rg_id:
+            stats['skipped'] += 1
+            continue
+        # FIX: Create resource ID in lowercase
+        yield {
+            'id': f"{rg_id}/providers/microsoft.compute/virtualmachines/{row['NAME']}".lower(),
+            'name': row['NAME'], 'type': 'Virtual machine', 'location': row['LOCATION'],
+            'resource_group_id': rg_id, 'status': row['STATUS'], 'os': row['OPERATING SYSTEM'],
+            'size': row['SIZE'], 'public_ip': row['PUBLIC IP ADDRESS'], 'disks': row['DISKS']
+        }
 
-    vm_map = {}
-    rg_map = context.get('rg_map', {})
-    sub_map = context.get('sub_map', {})
+def seed_vms(db, context, rows=None, stats=None):
+    """Seeds virtual machine data from its CSV file, or from rows already parsed by the seeder's worker pool."""
+    if not os.path.exists(VMS_CSV):
+        print(f"Warning: {VMS_CSV} not found. Treating it as empty.")
 
-    with open(VMS_CSV, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            sub_obj = sub_map.get(row['SUBSCRIPTION'].upper())
-            if sub_obj:
-                # FIX: Use lowercase for lookup key
-                rg_id_key = f"/subscriptions/{sub_obj.id}/resourceGroups/{row['RESOURCE GROUP']}".lower()
-                rg_obj = rg_map.get(rg_id_key)
-                if rg_obj:
-                    # FIX: Create resource ID in lowercase
-                    vm_id = f"{rg_obj.id}/providers/microsoft.compute/virtualmachines/{row['NAME']}".lower()
-                    vm = VM(
-                        id=vm_id, name=row['NAME'], type='Virtual machine', location=row['LOCATION'],
-                        resource_group_id=rg_obj.id, status=row['STATUS'], os=row['OPERATING SYSTEM'], 
-                        size=row['SIZE'], public_ip=row['PUBLIC IP ADDRESS'], disks=row['DISKS']
-                    )
-                    db.session.add(vm)
-                    vm_map[vm_id] = vm
-    
-    db.session.commit()
-    print(f"Seeded {len(vm_map)} VMs.")
-    context['vm_map'] = vm_map
+    if rows is None:
+        stats = {'skipped': 0}
+        rows = iter_vms(context, stats)
+    with BulkLoader(db, VM, chunk_size=context.get('chunk_size'), label='VMs',
+                    incremental=context.get('incremental', False)) as loader:
+        loader.add_many(rows)
+    print(f"Seeded {loader.summary()}.")
+    if stats['skipped'] > 0:
+        print(f"Skipped {stats['skipped']} rows with an unknown subscription or resource group.")
+    removed = loader.delete_missing()
+    if removed:
+        print(f"Removed {removed} VMs no longer in the export.")
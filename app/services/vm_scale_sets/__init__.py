@@ -1,17 +1,28 @@
-from .routes import vmss_bp
-from .seeder import seed_vmss
-
 SERVICE_CONFIG = {
     'KEY': 'vm_scale_sets',
     'NAME': 'VM Scale Sets',
-    'BLUEPRINT': vmss_bp,
+    'BLUEPRINT': '.routes:vmss_bp',
     'MODEL_MODULES': ['.services.vm_scale_sets.models'],
     # FIX: Add the correct model class name
     'MODEL_CLASS_NAME': 'VMSS',
-    'SEEDER_FUNC': seed_vmss,
+    'SEEDER_FUNC': '.seeder:seed_vmss',
+    # Parses the CSV in a worker process; only SEEDER_FUNC touches the database.
+    'PARSER_FUNC': '.seeder:iter_vmss',
+    'DEPENDS_ON': ['core'],
     'CSV_FILE': 'AzurevirtualMachineScaleSets.csv',
     'SHOW_IN_NAV': True,
     'NAV_ORDER': 2,
     'LIST_ROUTE': 'vmss.vmss_list',
-    'DETAIL_ROUTE': 'vmss.vmss_detail'
-}
\ No newline at end of file
+    'DETAIL_ROUTE': 'vmss.vmss_detail',
+    'LIST_SPEC': {
+        'TITLE': 'Virtual Machine Scale Sets',
+        'EXPORT_NAME': 'vm-scale-sets',
+        'COLUMNS': [
+            {'label': 'OS', 'key': 'os', 'sortable': True, 'filterable': True},
+            {'label': 'Size', 'key': 'size', 'sortable': True, 'filterable': True},
+            {'label': 'Instances', 'key': 'instances', 'sortable': True, 'align': 'center', 'filterable': False},
+            {'label': 'Status', 'key': 'status', 'sortable': True, 'filterable': True},
+        ],
+    },
+    'RESOURCE_TYPE': 'Virtual machine scale set' # Must match the polymorphic_identity
+}
@@ -5,8 +5,8 @@ from app.services.core.models import Resource
 class VMSS(Resource):
     __tablename__ = 'vmss'
     id = db.Column(db.String, db.ForeignKey('resources.id'), primary_key=True)
-    status = db.Column(db.String)
-    os = db.Column(db.String)
-    size = db.Column(db.String)
+    status = db.Column(db.String, index=True)
+    os = db.Column(db.String, index=True)
+    size = db.Column(db.String, index=True)
     instances = db.Column(db.Integer)
     __mapper_args__ = {'polymorphic_identity': 'Virtual machine scale set'}
\ No newline at end of file
@@ -1,37 +1,41 @@
-import csv
 import os
 from .models import VMSS
+from app.services.core.bulk import BulkLoader, iter_csv_rows
+from app.services.core.seeder import resolve_resource_group_id
 
-def seed_vmss(db, context):
-    """Seeds VM Scale Set data from its CSV file."""
-    VMSS_CSV = 'AzurevirtualMachineScaleSets.csv'
+VMSS_CSV = 'AzurevirtualMachineScaleSets.csv'
+
+def iter_vmss(context, stats):
+    """Yields normalized VM Scale Set rows from the CSV, resolved against the core id maps."""
     if not os.path.exists(VMSS_CSV):
-        print(f"Warning: {VMSS_CSV} not found. Skipping VMSS seeding.")
         return
+    for row in iter_csv_rows(VMSS_CSV):
+        rg_id = resolve_resource_group_id(context, row['SUBSCRIPTION'], row['RESOURCE GROUP'])
+        if not rg_id:
+            stats['skipped'] += 1
+            continue
+        # FIX: Create resource ID in lowercase
+        yield {
+            'id': f"{rg_id}/providers/microsoft.compute/virtualmachinescalesets/{row['NAME']}".lower(),
+            'name': row['NAME'], 'type': 'Virtual machine scale set', 'location': row['LOCATION'],
+            'resource_group_id': rg_id, 'status': row['STATUS'], 'os': row['OPERATING SYSTEM'],
+            'size': row['SIZE'], 'instances': row['INSTANCES']
+        }
 
-    vmss_map = {}
-    rg_map = context.get('rg_map', {})
-    sub_map = context.get('sub_map', {})
-
-    with open(VMSS_CSV, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            sub_obj = sub_map.get(row['SUBSCRIPTION'].upper())
-            if sub_obj:
-                # FIX: Use lowercase for lookup key
-                rg_id_key = f"/subscriptions/{sub_obj.id}/resourceGroups/{row['RESOURCE GROUP']}".lower()
-                rg_obj = rg_map.get(rg_id_key)
-                if rg_obj:
-                    # FIX: Create resource ID in lowercase
-                    vmss_id = f"{rg_obj.id}/providers/microsoft.compute/virtualmachinescalesets/{row['NAME']}".lower()
-                    vmss = VMSS(
-                        id=vmss_id, name=row['NAME'], type='Virtual machine scale set', location=row['LOCATION'],
-                        resource_group_id=rg_obj.id, status=row['STATUS'], os=row['OPERATING SYSTEM'], 
-                        size=row['SIZE'], instances=row['INSTANCES']
-                    )
-                    db.session.add(vmss)
-                    vmss_map[vmss_id] = vmss
+def seed_vmss(db, context, rows=None, stats=None):
+    """Seeds VM Scale Set data from its CSV file, or from rows already parsed by the seeder's worker pool."""
+    if not os.path.exists(VMSS_CSV):
+        print(f"Warning: {VMSS_CSV} not found. Treating it as empty.")
 
-    db.session.commit()
-    print(f"Seeded {len(vmss_map)} VM Scale Sets.")
-    context['vmss_map'] = vmss_map
+    if rows is None:
+        stats = {'skipped': 0}
+        rows = iter_vmss(context, stats)
+    with BulkLoader(db, VMSS, chunk_size=context.get('chunk_size'), label='VM Scale Sets',
+                    incremental=context.get('incremental', False)) as loader:
+        loader.add_many(rows)
+    print(f"Seeded {loader.summary()}.")
+    if stats['skipped'] > 0:
+        print(f"Skipped {stats['skipped']} rows with an unknown subscription or resource group.")
+    removed = loader.delete_missing()
+    if removed:
+        print(f"Removed {removed} VM Scale Sets no longer in the export.")
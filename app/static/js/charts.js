@@ -4,6 +4,8 @@ let categoryChartInstance, impactChartInstance, subscriptionChartInstance;
 let selectedCategory = null;
 let originalSubscriptionData = {};
 let currentSubGroupBy = 'impact';
+// The offsets of the drill-downs into "Other" the subscription chart went through, per grouping.
+let subscriptionOffsets = { impact: [0], category: [0] };
 
 const impactColors = { 'High': 'rgba(239, 68, 68, 0.8)', 'Medium': 'rgba(249, 115, 22, 0.8)', 'Low': 'rgba(34, 197, 94, 0.8)' };
 const categoryColors = {
@@ -13,7 +15,7 @@ const categoryColors = {
 const textColor = document.body.classList.contains('dark') ? '#e5e7eb' : '#374151';
 
 function initializeDashboardCharts() {
-    fetch('/api/data/recommendations-summary')
+    fetch(SCRIPT_ROOT + '/api/data/recommendations-summary')
         .then(response => response.json())
         .then(data => {
             renderCategoryChart(data.categories);
@@ -26,6 +28,15 @@ function initializeDashboardCharts() {
     document.getElementById('group-by-category-btn')?.addEventListener('click', () => switchSubscriptionGroup('category'));
     document.getElementById('hide-sub-id-toggle')?.addEventListener('change', () => renderSubscriptionChart());
     document.getElementById('show-with-recs-toggle')?.addEventListener('change', () => renderSubscriptionChart());
+    document.getElementById('subscription-back-btn')?.addEventListener('click', () => {
+        subscriptionOffsets[currentSubGroupBy].pop();
+        fetchSubscriptionData(currentSubGroupBy);
+    });
+}
+
+// The server groups the smallest slices or bars of a chart in a last "Other" one.
+function isOtherIndex(data, index) {
+    return Boolean(data.other) && index === data.labels.length - 1;
 }
 
 function switchSubscriptionGroup(groupBy) {
@@ -36,15 +47,32 @@ function switchSubscriptionGroup(groupBy) {
     fetchSubscriptionData(groupBy);
 }
 
+function subscriptionDataKey(groupBy) {
+    const offsets = subscriptionOffsets[groupBy];
+    return `${groupBy}:${offsets[offsets.length - 1]}`;
+}
+
 function fetchSubscriptionData(groupBy) {
-    if (originalSubscriptionData[groupBy]) {
+    const key = subscriptionDataKey(groupBy);
+    if (originalSubscriptionData[key]) {
         renderSubscriptionChart();
         return;
     }
-    fetch(`/api/data/recommendations-by-subscription/${groupBy}`)
+    const offsets = subscriptionOffsets[groupBy];
+    fetch(`${SCRIPT_ROOT}/api/data/recommendations-by-subscription/${groupBy}?offset=${offsets[offsets.length - 1]}`)
         .then(response => response.json())
         .then(data => {
-            originalSubscriptionData[groupBy] = data;
+            originalSubscriptionData[key] = data;
+            renderSubscriptionChart();
+        });
+}
+
+function drillIntoOtherSubscriptions(data) {
+    subscriptionOffsets[currentSubGroupBy].push(data.other.offset);
+    fetch(data.other.drilldown)
+        .then(response => response.json())
+        .then(other => {
+            originalSubscriptionData[subscriptionDataKey(currentSubGroupBy)] = other;
             renderSubscriptionChart();
         });
 }
@@ -63,7 +91,7 @@ function renderCategoryChart(data) {
             responsive: true, maintainAspectRatio: false,
             plugins: { legend: { position: 'right', labels: { color: textColor } } },
             onClick: (evt, elements) => {
-                if (elements.length > 0) {
+                if (elements.length > 0 && !isOtherIndex(data, elements[0].index)) {
                     const index = elements[0].index;
                     const label = evt.chart.data.labels[index];
                     const currentOffset = evt.chart.data.datasets[0].offset[index];
@@ -72,7 +100,7 @@ function renderCategoryChart(data) {
 
                     if (currentOffset > 0) {
                         selectedCategory = null;
-                        fetch('/api/data/recommendations-summary').then(res => res.json()).then(d => renderImpactChart(d.impacts, 'Recommendations by Impact'));
+                        fetch(SCRIPT_ROOT + '/api/data/recommendations-summary').then(res => res.json()).then(d => renderImpactChart(d.impacts, 'Recommendations by Impact'));
                     } else {
                         selectedCategory = label;
                         evt.chart.data.datasets[0].offset[index] = 20;
@@ -100,9 +128,9 @@ function renderImpactChart(data, title) {
             responsive: true, maintainAspectRatio: false,
             plugins: { legend: { position: 'right', labels: { color: textColor } } },
             onClick: (evt, elements) => {
-                if (elements.length > 0) {
+                if (elements.length > 0 && !isOtherIndex(data, elements[0].index)) {
                     const impactLabel = evt.chart.data.labels[elements[0].index];
-                    let url = new URL(window.location.origin + "/recommendations");
+                    let url = new URL(window.location.origin + SCRIPT_ROOT + "/recommendations");
                     url.searchParams.append('impact', impactLabel);
                     if (selectedCategory) {
                         url.searchParams.append('category', selectedCategory.replace(/ /g, '-').toLowerCase());
@@ -115,19 +143,21 @@ function renderImpactChart(data, title) {
 }
 
 function updateImpactChartForCategory(category, title) {
-    fetch(`/api/data/impact-by-category/${category.replace(/ /g, '-').toLowerCase()}`)
+    fetch(`${SCRIPT_ROOT}/api/data/impact-by-category/${category.replace(/ /g, '-').toLowerCase()}`)
         .then(response => response.json())
         .then(data => renderImpactChart(data, title));
 }
 
 function renderSubscriptionChart() {
-    const data = originalSubscriptionData[currentSubGroupBy];
+    const data = originalSubscriptionData[subscriptionDataKey(currentSubGroupBy)];
     if (!data) return;
 
     const ctx = document.getElementById('subscriptionChart').getContext('2d');
     if (subscriptionChartInstance) subscriptionChartInstance.destroy();
 
     let filteredData = JSON.parse(JSON.stringify(data));
+    // The index in data of each bar, since bars without recommendations may be hidden.
+    filteredData.indices = filteredData.labels.map((_, i) => i);
 
     if (document.getElementById('show-with-recs-toggle')?.checked) {
         const indicesToKeep = [];
@@ -136,13 +166,20 @@ function renderSubscriptionChart() {
             if (totalRecs > 0) indicesToKeep.push(i);
         }
         filteredData.labels = filteredData.labels.filter((_, i) => indicesToKeep.includes(i));
+        filteredData.indices = filteredData.indices.filter((_, i) => indicesToKeep.includes(i));
         filteredData.datasets.forEach(ds => {
             ds.data = ds.data.filter((_, i) => indicesToKeep.includes(i));
         });
     }
 
+    const shown = data.labels.length - (data.other ? 1 : 0);
+    document.getElementById('subscription-chart-title').textContent = data.offset > 0
+        ? `Recommendations by Subscription (${data.offset + 1}-${data.offset + shown} of ${data.total_groups})`
+        : 'Recommendations by Subscription';
+    document.getElementById('subscription-back-btn')?.classList.toggle('hidden', subscriptionOffsets[currentSubGroupBy].length === 1);
+
     if (document.getElementById('hide-sub-id-toggle')?.checked) {
-        filteredData.labels = filteredData.labels.map(label => label.split(' (')[0]);
+        filteredData.labels = filteredData.labels.map((label, i) => isOtherIndex(data, filteredData.indices[i]) ? label : label.split(' (')[0]);
     }
 
     const colors = currentSubGroupBy === 'impact' ? impactColors : categoryColors;
@@ -171,12 +208,16 @@ function renderSubscriptionChart() {
             scales: { x: { stacked: true, ticks: { color: textColor } }, y: { stacked: true, ticks: { color: textColor } } },
             onClick: (evt, elements) => {
                 if (elements.length > 0) {
-                    const subIndex = elements[0].index;
+                    const subIndex = filteredData.indices[elements[0].index];
+                    if (isOtherIndex(data, subIndex)) {
+                        drillIntoOtherSubscriptions(data);
+                        return;
+                    }
                     const groupIndex = elements[0].datasetIndex;
                     const subscriptionLabel = data.labels[subIndex].split(' (')[0];
                     const groupLabel = data.datasets[groupIndex].label;
 
-                    let url = new URL(window.location.origin + "/recommendations");
+                    let url = new URL(window.location.origin + SCRIPT_ROOT + "/recommendations");
                     // FIX: Use 'subscription_name' to match the backend route's expected parameter
                     url.searchParams.append('subscription_name', subscriptionLabel);
                     url.searchParams.append(currentSubGroupBy, groupLabel.replace(/ /g, '-').toLowerCase());
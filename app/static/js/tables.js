@@ -22,6 +22,7 @@ function initializeInteractiveTable() {
             url.searchParams.set('sort_by', columnKey);
             url.searchParams.set('sort_order', newSortOrder);
             url.searchParams.set('page', '1');
+            url.searchParams.delete('cursor'); // Keyset cursors only make sense for the sort they came from
             window.location = url.toString();
         });
     });
@@ -63,13 +64,14 @@ function createFilterMenu(header, filterKey) {
     menu.addEventListener('click', e => e.stopPropagation()); // Prevent menu from closing on inner click
 
     // `tableFilterData` and `activeFilters` are expected to be global JS objects defined in the HTML template
+    // Each option is {value, count}, where count is the number of rows matching the current filters.
     const options = tableFilterData[filterKey] || [];
     const activeOptions = new Set(activeFilters[filterKey] || []);
 
     const optionsHTML = options.map(opt => `
         <label class="block px-2 py-1 hover:bg-gray-100 dark:hover:bg-gray-700 rounded">
-            <input type="checkbox" class="mr-2 filter-option" value="${opt}" ${activeOptions.has(opt) ? 'checked' : ''}>
-            ${opt || '(Blank)'}
+            <input type="checkbox" class="mr-2 filter-option" value="${opt.value}" ${activeOptions.has(String(opt.value)) ? 'checked' : ''}>
+            ${opt.value || '(Blank)'} <span class="text-gray-500 dark:text-gray-400">(${opt.count.toLocaleString()})</span>
         </label>
     `).join('');
 
@@ -109,5 +111,6 @@ function applyAllFilters() {
     });
 
     url.searchParams.set('page', '1');
+    url.searchParams.delete('cursor');
     window.location = url.toString();
 }
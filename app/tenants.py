@@ -0,0 +1,169 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import create_engine, event
+from werkzeug.exceptions import NotFound
+from .db import file_identity
+
+TENANT_MODES = ('prefix', 'host')
+DEFAULT_MAX_OPEN = 16
+# Tenant names become directory names and URL segments.
+TENANT_NAME = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$')
+ENVIRON_KEY = 'azurereport.tenant'
+
+def tenant_database_config(tenants_dir, name):
+    """
+    The database settings of one client: TENANTS_DIR/<name>/report.db and
+    TENANTS_DIR/<name>/history.db. Raises ValueError for invalid names.
+    """
+    if not TENANT_NAME.match(name or ''):
+        raise ValueError(f"Invalid tenant name {name!r}: use lowercase letters, digits, '-' and '_'.")
+    directory = os.path.join(os.path.abspath(tenants_dir), name)
+    return {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'report.db'),
+        'HISTORY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'history.db'),
+    }
+
+class Tenant:
+    """
+    The open databases of one client: its engines by bind key, and
+    `extensions`, which holds its caches as app.extensions does in
+    single-tenant mode.
+    """
+
+    def __init__(self, name, engines, path):
+        self.name = name
+        self.engines = engines
+        self.path = path
+        self.file = file_identity(path)
+        self.extensions = {}
+
+    def drop_replaced_connections(self):
+        """Drops the pooled connections to the report once the seeder replaced its file."""
+        identity = file_identity(self.path)
+        if identity != self.file:
+            self.engines[None].dispose()
+            self.extensions.pop('data_version', None)
+            self.file = identity
+
+    def dispose(self, close=True):
+        # Connections still in use are closed when they are returned.
+        for engine in self.engines.values():
+            engine.dispose(close=close)
+
+class TenantRouter:
+    """
+    Opens the databases of each client on its first request and keeps those
+    of the TENANT_MAX_OPEN most recently used ones. The least recently used
+    client is closed, with its caches, to make room for another.
+    """
+
+    def __init__(self, app):
+        self.tenants_dir = app.config['TENANTS_DIR']
+        self.max_open = app.config.get('TENANT_MAX_OPEN') or DEFAULT_MAX_OPEN
+        self.engine_options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        # Shared with listen_engines, so listeners added after this router still apply.
+        self.listeners = app.extensions.setdefault('engine_listeners', [])
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _config(self, name):
+        try:
+            return tenant_database_config(self.tenants_dir, name)
+        except ValueError:
+            return None
+
+    def exists(self, name):
+        """True if the client has a seeded report."""
+        config = self._config(name)
+        return config is not None and os.path.exists(config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):])
+
+    def get(self, name):
+        """The open Tenant for a client, opening it and closing the least recently used one if needed."""
+        with self._lock:
+            tenant = self._open.get(name)
+            if tenant is not None:
+                self._open.move_to_end(name)
+            else:
+                tenant = self._open[name] = self._open_tenant(name)
+                while len(self._open) > self.max_open:
+                    self._open.popitem(last=False)[1].dispose()
+        tenant.drop_replaced_connections()
+        return tenant
+
+    def dispose(self, close=True):
+        """Drops the pooled connections of every open client; close=False leaves them to another process."""
+        with self._lock:
+            for tenant in self._open.values():
+                tenant.dispose(close=close)
+
+    def _open_tenant(self, name):
+        config = self._config(name)
+        engines = {None: self._create_engine(config['SQLALCHEMY_DATABASE_URI']),
+                   'history': self._create_engine(config['HISTORY_DATABASE_URI'])}
+        return Tenant(name, engines, config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):])
+
+    def _create_engine(self, uri):
+        engine = create_engine(uri, **self.engine_options)
+        for identifier, fn, backend in self.listeners:
+            if backend is None or engine.url.get_backend_name() == backend:
+                event.listen(engine, identifier, fn)
+        return engine
+
+class TenantMiddleware:
+    """
+    Finds the client of each request before Flask sees it. With 'prefix',
+    the first path segment names it, /contoso/vms/, and is moved to
+    SCRIPT_NAME, so url_for() keeps links within the client. With 'host',
+    the first label of the host name does, contoso.reports.example.com.
+    """
+
+    def __init__(self, wsgi_app, router, mode):
+        self.wsgi_app = wsgi_app
+        self.router = router
+        self.mode = mode
+
+    def __call__(self, environ, start_response):
+        if self.mode == 'prefix':
+            _, _, path = environ.get('PATH_INFO', '').partition('/')
+            name, slash, rest = path.partition('/')
+        else:
+            host = environ.get('HTTP_HOST') or environ.get('SERVER_NAME', '')
+            name = host.split(':')[0].split('.')[0]
+        if not self.router.exists(name):
+            return NotFound(f"No report for client {name!r}.")(environ, start_response)
+        environ[ENVIRON_KEY] = name
+        if self.mode == 'prefix':
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '').rstrip('/') + '/' + name
+            environ['PATH_INFO'] = slash + rest
+        return self.wsgi_app(environ, start_response)
+
+def init_tenants(app):
+    """
+    Turns on multi-tenant mode when TENANT_MODE is 'prefix' or 'host': one
+    app serves the report of every client in TENANTS_DIR, and each request
+    uses the databases and caches of its client.
+    """
+    mode = app.config.get('TENANT_MODE')
+    if not mode:
+        return
+    if mode not in TENANT_MODES:
+        raise ValueError(f"TENANT_MODE must be one of {', '.join(TENANT_MODES)}, not {mode!r}.")
+    router = TenantRouter(app)
+    app.extensions['tenants'] = router
+    app.wsgi_app = TenantMiddleware(app.wsgi_app, router, mode)
+
+    @app.before_request
+    def select_tenant():
+        g.tenant = router.get(request.environ[ENVIRON_KEY])
+
+def current_tenant():
+    """The Tenant of the current request in multi-tenant mode, otherwise None."""
+    return g.get('tenant') if has_app_context() else None
+
+def tenant_extensions():
+    """Where per-client caches are kept: the tenant's own dict, or app.extensions with a single client."""
+    tenant = current_tenant()
+    return tenant.extensions if tenant is not None else current_app.extensions
@@ -0,0 +1,5 @@
+"""
+Benchmarks against a synthetic tenant: `python -m bench.generate` writes the
+CSV exports, `python -m bench.run` seeds them and times every route, and
+`python -m bench.compare` diffs two result files.
+"""
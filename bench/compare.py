@@ -0,0 +1,64 @@
+import argparse
+import json
+
+DEFAULT_THRESHOLD = 0.2  # 20% slower
+# Differences below these are noise, whatever the ratio.
+MIN_FLAGGED_MS = 2.0
+MIN_FLAGGED_SECONDS = 0.5
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare_results(old, new, metric='p95_ms', threshold=DEFAULT_THRESHOLD):
+    """
+    Compares two bench.run results route by route and stage by stage.
+    Returns (lines, regressions): a printable report and the number of routes
+    or seeding stages that got more than `threshold` slower, or that now run
+    more queries.
+    """
+    lines, regressions = [], 0
+    old_routes = {r['url']: r for r in old.get('routes', [])}
+    lines.append(f"{'old':>10} {'new':>10} {'change':>8}  {'queries':>9}  route ({metric})")
+    for route in new.get('routes', []):
+        before = old_routes.get(route['url'])
+        if not before:
+            lines.append(f"{'':>10} {route[metric]:>10.2f} {'new':>8}  {route['queries']:>9}  {route['url']}")
+            continue
+        change = route[metric] / before[metric] - 1 if before[metric] else 0.0
+        slower = change > threshold and route[metric] - before[metric] > MIN_FLAGGED_MS
+        more_queries = route['queries'] > before['queries']
+        regressions += slower or more_queries
+        queries = f"{before['queries']}->{route['queries']}" if more_queries else str(route['queries'])
+        flag = '  REGRESSION' if slower or more_queries else ''
+        lines.append(f"{before[metric]:>10.2f} {route[metric]:>10.2f} {change:>+8.0%}  {queries:>9}  {route['url']}{flag}")
+
+    old_seed, new_seed = old.get('seed', {}), new.get('seed', {})
+    stages = [(f"seed {key}", old_seed.get('services', {}).get(key), seconds)
+              for key, seconds in new_seed.get('services', {}).items()]
+    stages += [(f"seed {key}", old_seed.get(key), new_seed.get(key))
+               for key in ('post_seed', 'kpi_snapshot', 'search_index', 'commit', 'analyze', 'analytics', 'total')]
+    lines.append(f"\n{'old':>10} {'new':>10} {'change':>8}  seeding (s)")
+    for name, before, after in stages:
+        if before is None or after is None:
+            continue
+        change = after / before - 1 if before else 0.0
+        slower = change > threshold and after - before > MIN_FLAGGED_SECONDS
+        regressions += slower
+        lines.append(f"{before:>10.2f} {after:>10.2f} {change:>+8.0%}  {name}{'  REGRESSION' if slower else ''}")
+    return lines, regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files from bench.run.")
+    parser.add_argument('old', help="Baseline results JSON.")
+    parser.add_argument('new', help="Results JSON to check against the baseline.")
+    parser.add_argument('--metric', default='p95_ms', help="Route latency to compare, e.g. p50_ms or mean_ms (default: p95_ms).")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Slowdown ratio reported as a regression (default: {DEFAULT_THRESHOLD}).")
+    args = parser.parse_args()
+
+    report, regressed = compare_results(load(args.old), load(args.new), metric=args.metric, threshold=args.threshold)
+    print('\n'.join(report))
+    print(f"\n{regressed} regressions.")
+    if regressed:
+        exit(1)
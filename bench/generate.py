@@ -0,0 +1,194 @@
+import argparse
+import csv
+import os
+import random
+
+SUBSCRIPTIONS_CSV = 'Subscriptions.csv'
+RESOURCE_GROUPS_CSV = 'Azureresourcegroups.csv'
+VMS_CSV = 'AzureVirtualMachines.csv'
+VMSS_CSV = 'AzurevirtualMachineScaleSets.csv'
+STORAGE_CSV = 'AzureStorageAccounts.csv'
+ADVISOR_CSV = 'Advisor_Synthetic_2024-05-01T10_00_00.csv'
+
+# Share of the resources generated for each service.
+RESOURCE_MIX = {'vms': 0.6, 'vmss': 0.1, 'storage': 0.3}
+RESOURCES_PER_GROUP = 50
+GROUPS_PER_SUBSCRIPTION = 40
+
+LOCATIONS = ['westeurope', 'northeurope', 'eastus', 'eastus2', 'westus2', 'uksouth', 'francecentral', 'southeastasia']
+ENVIRONMENTS = ['prod', 'dev', 'test', 'uat', 'shared']
+APPLICATIONS = ['web', 'api', 'sql', 'etl', 'ad', 'jump', 'k8s', 'cache', 'files', 'backup', 'erp', 'crm']
+VM_SIZES = ['Standard_B2ms', 'Standard_D2s_v3', 'Standard_D4s_v3', 'Standard_D8s_v5', 'Standard_E4s_v3', 'Standard_F4s_v2', 'Standard_DS1_v2']
+VM_STATUSES = ['Running'] * 8 + ['Stopped (deallocated)', 'Stopped']
+OPERATING_SYSTEMS = ['Windows'] * 3 + ['Linux'] * 2
+VMSS_STATUSES = ['Succeeded'] * 9 + ['Failed']
+STORAGE_SKUS = ['Standard_LRS', 'Standard_GRS', 'Standard_RAGRS', 'Standard_ZRS', 'Premium_LRS']
+STORAGE_KINDS = ['StorageV2'] * 6 + ['BlobStorage', 'FileStorage', 'Storage']
+
+# Advisor recommendations by resource type: (category, business impact, text).
+RECOMMENDATIONS = {
+    'Virtual machine': [
+        ('Cost', 'High', 'Right-size or shutdown underutilized virtual machines'),
+        ('Cost', 'Medium', 'Buy virtual machine reserved instances to save money over pay-as-you-go costs'),
+        ('Cost', 'Medium', 'Consider Azure Hybrid Benefit for Windows virtual machines'),
+        ('Security', 'High', 'Machines should have vulnerability findings resolved'),
+        ('Security', 'Medium', 'Management ports should be closed on your virtual machines'),
+        ('Security', 'Medium', 'Endpoint protection should be installed on your machines'),
+        ('Security', 'Low', 'Guest Configuration extension should be installed on machines'),
+        ('Reliability', 'Medium', 'Enable Backups on your Virtual Machines'),
+        ('Reliability', 'Low', 'Use Managed Disks to improve data reliability'),
+        ('Performance', 'Medium', 'Improve user experience and connectivity by deploying VMs closer to the user location'),
+        ('Operational excellence', 'Low', 'Enable virtual machine guest diagnostics'),
+    ],
+    'Virtual machine scale set': [
+        ('Cost', 'High', 'Right-size or shutdown underutilized virtual machine scale sets'),
+        ('Security', 'High', 'Vulnerabilities in security configuration on your virtual machine scale sets should be remediated'),
+        ('Security', 'Medium', 'System updates on virtual machine scale sets should be installed'),
+        ('Reliability', 'Medium', 'Enable automatic repair policy on virtual machine scale sets'),
+        ('Reliability', 'Low', 'Deploy your virtual machine scale set across availability zones'),
+        ('Operational excellence', 'Low', 'Upgrade the virtual machine scale set to the latest model'),
+    ],
+    'Storage account': [
+        ('Cost', 'Medium', 'Use lifecycle management to move infrequently accessed data to cooler tiers'),
+        ('Cost', 'Low', 'Reserved capacity for Blob storage'),
+        ('Security', 'High', 'Storage account public access should be disallowed'),
+        ('Security', 'Medium', 'Secure transfer to storage accounts should be enabled'),
+        ('Security', 'Medium', 'Storage accounts should restrict network access'),
+        ('Reliability', 'Medium', 'Enable soft delete for your Azure Storage blobs'),
+        ('Reliability', 'Low', 'Use geo-redundant storage for higher durability'),
+        ('Performance', 'Low', 'Upgrade your Storage Client Library to the latest version'),
+        ('Operational excellence', 'Low', 'Enable diagnostic settings for storage accounts'),
+    ],
+}
+# Share of recommendations pointing at resources missing from the resource exports.
+# The seeder keeps them, with a resource id no resource has; the seeder reports
+# how many there are and the list pages show them as not imported.
+ORPHAN_RATE = 0.01
+
+def parse_size(value):
+    """Parses a resource count like '10k', '100k', '1M' or '250000'."""
+    text = str(value).strip().lower().replace('_', '')
+    multiplier = 1
+    if text.endswith('k'):
+        multiplier, text = 1_000, text[:-1]
+    elif text.endswith('m'):
+        multiplier, text = 1_000_000, text[:-1]
+    try:
+        size = int(float(text) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size: {value!r}")
+    if size < 1:
+        raise argparse.ArgumentTypeError(f"Size must be at least 1: {value!r}")
+    return size
+
+def _portal_writer(f, header):
+    """A CSV writer for a portal "Export to CSV" file, which starts with a 'sep=' hint line."""
+    f.write('sep=,\n')
+    writer = csv.writer(f)
+    writer.writerow(header)
+    return writer
+
+def generate_tenant(out_dir, resources, seed=0, recommendations_per_resource=1.5):
+    """
+    Writes a synthetic tenant of about `resources` resources to out_dir: the
+    subscription, resource group, VM, VMSS and storage account exports, and an
+    Advisor export, with the headers the seeders read. Rows are written as
+    they are generated, so memory stays flat for any size, and the same seed
+    always produces the same files. Returns the number of rows per file.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    group_count = max(1, -(-resources // RESOURCES_PER_GROUP))
+    subscription_count = max(1, -(-group_count // GROUPS_PER_SUBSCRIPTION))
+    counts = {}
+
+    subscriptions = []
+    with open(os.path.join(out_dir, SUBSCRIPTIONS_CSV), 'w', newline='', encoding='utf-8') as f:
+        writer = _portal_writer(f, ['SUBSCRIPTION NAME', 'SUBSCRIPTION ID'])
+        for i in range(subscription_count):
+            subscription = (f"{rng.choice(ENVIRONMENTS)}-subscription-{i:03d}",
+                            f"{rng.getrandbits(32):08x}-{i:04x}-4{rng.getrandbits(12):03x}-a{rng.getrandbits(12):03x}-{rng.getrandbits(48):012x}")
+            subscriptions.append(subscription)
+            writer.writerow(subscription)
+    counts[SUBSCRIPTIONS_CSV] = subscription_count
+
+    groups = []
+    with open(os.path.join(out_dir, RESOURCE_GROUPS_CSV), 'w', newline='', encoding='utf-8') as f:
+        writer = _portal_writer(f, ['NAME', 'SUBSCRIPTION', 'LOCATION'])
+        for i in range(group_count):
+            subscription = subscriptions[i % subscription_count]
+            name = f"rg-{rng.choice(APPLICATIONS)}-{rng.choice(ENVIRONMENTS)}-{i:05d}"
+            groups.append((name, subscription))
+            writer.writerow([name, subscription[0], rng.choice(LOCATIONS)])
+    counts[RESOURCE_GROUPS_CSV] = group_count
+
+    advisor_file = open(os.path.join(out_dir, ADVISOR_CSV), 'w', newline='', encoding='utf-8')
+    advisor = csv.writer(advisor_file)
+    advisor.writerow(['Category', 'Business Impact', 'Recommendation', 'Subscription ID', 'Subscription Name',
+                      'Resource Group', 'Resource Name', 'Type', 'Potential Annual Cost Savings'])
+    advised = 0
+
+    def advise(resource_type, name, group):
+        nonlocal advised
+        catalogue = RECOMMENDATIONS[resource_type]
+        # Up to twice the average, so the mean comes out at recommendations_per_resource.
+        wanted = min(len(catalogue), int(rng.random() * 2 * recommendations_per_resource + 0.5))
+        for category, impact, text in rng.sample(catalogue, wanted):
+            savings = f"{rng.randint(50, 25000):,}" if category == 'Cost' else ''
+            advisor.writerow([category, impact, text, group[1][1], group[1][0], group[0], name, resource_type, savings])
+            advised += 1
+            if rng.random() < ORPHAN_RATE:
+                advisor.writerow([category, impact, text, group[1][1], group[1][0], group[0],
+                                  f"{name}-deleted", resource_type, savings])
+                advised += 1
+
+    def write_resources(filename, header, count, make_row, resource_type):
+        with open(os.path.join(out_dir, filename), 'w', newline='', encoding='utf-8') as f:
+            writer = _portal_writer(f, header)
+            for i in range(count):
+                group = rng.choice(groups)
+                row = make_row(i, group)
+                writer.writerow(row)
+                advise(resource_type, row[0], group)
+        counts[filename] = count
+
+    vm_count = round(resources * RESOURCE_MIX['vms'])
+    vmss_count = round(resources * RESOURCE_MIX['vmss'])
+    storage_count = max(resources - vm_count - vmss_count, 0)
+    write_resources(VMS_CSV, ['NAME', 'SUBSCRIPTION', 'RESOURCE GROUP', 'LOCATION', 'STATUS',
+                              'OPERATING SYSTEM', 'SIZE', 'PUBLIC IP ADDRESS', 'DISKS'], vm_count,
+                    lambda i, group: [f"vm-{rng.choice(APPLICATIONS)}-{rng.choice(ENVIRONMENTS)}-{i:07d}", group[1][0], group[0],
+                                      rng.choice(LOCATIONS), rng.choice(VM_STATUSES), rng.choice(OPERATING_SYSTEMS),
+                                      rng.choice(VM_SIZES),
+                                      f"20.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}" if rng.random() < 0.2 else '',
+                                      rng.randint(1, 8)],
+                    'Virtual machine')
+    write_resources(VMSS_CSV, ['NAME', 'SUBSCRIPTION', 'RESOURCE GROUP', 'LOCATION', 'STATUS',
+                               'OPERATING SYSTEM', 'SIZE', 'INSTANCES'], vmss_count,
+                    lambda i, group: [f"vmss-{rng.choice(APPLICATIONS)}-{rng.choice(ENVIRONMENTS)}-{i:07d}", group[1][0], group[0],
+                                      rng.choice(LOCATIONS), rng.choice(VMSS_STATUSES), rng.choice(OPERATING_SYSTEMS),
+                                      rng.choice(VM_SIZES), rng.randint(0, 20)],
+                    'Virtual machine scale set')
+    write_resources(STORAGE_CSV, ['NAME', 'SUBSCRIPTION', 'RESOURCE GROUP', 'LOCATION', 'TYPE', 'KIND'], storage_count,
+                    lambda i, group: [f"st{rng.choice(APPLICATIONS)}{rng.choice(ENVIRONMENTS)}{i:07d}", group[1][0], group[0],
+                                      rng.choice(LOCATIONS), rng.choice(STORAGE_SKUS), rng.choice(STORAGE_KINDS)],
+                    'Storage account')
+
+    # Subscription-level cost rows appear in real exports and are skipped by the seeder.
+    for name, subscription_id in subscriptions:
+        advisor.writerow(['Cost', 'High', 'Buy reserved virtual machine instances to save money over pay-as-you-go costs',
+                          subscription_id, name, '', '', 'Subscription', f"{rng.randint(1000, 90000):,}"])
+        advised += 1
+    advisor_file.close()
+    counts[ADVISOR_CSV] = advised
+    return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write a synthetic Azure tenant as the CSV exports seeder.py reads.")
+    parser.add_argument('resources', type=parse_size, help="Number of resources, e.g. 10k, 100k or 1M.")
+    parser.add_argument('out_dir', help="Directory to write the CSV files to.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed writes the same files (default: 0).")
+    args = parser.parse_args()
+
+    for filename, rows in generate_tenant(args.out_dir, args.resources, seed=args.seed).items():
+        print(f"{filename}: {rows:,} rows")
@@ -0,0 +1,214 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from flask import url_for
+from app import create_app, db
+from app.diagnostics import capture_queries
+from app.services.core.models import Resource
+from bench.generate import ADVISOR_CSV, generate_tenant, parse_size
+from seeder import create_database, peak_memory_mb, run_seeders, write_analytics
+
+DEFAULT_REPEAT = 20
+# Exports read every row, so they are timed fewer times than pages.
+DEFAULT_EXPORT_REPEAT = 1
+PERCENTILES = (50, 90, 95, 99)
+
+# Values for URL rule arguments, one request per value.
+ARGUMENT_SAMPLES = {
+    'category': ['cost', 'security', 'operational-excellence'],
+    'group_by': ['impact', 'category'],
+    'fmt': ['csv', 'xlsx'],
+}
+# Extra variants of the list and search pages: filtered, re-sorted and deep pages.
+QUERY_VARIANTS = {
+    'main.search': [{'q': 'web'}, {'q': 'prod sql'}, {'q': 'vm-api-dev-0000042'}, {'q': 'storge'}],
+    'recs.recommendations_list': [{'impact': 'High', 'category': 'cost'}, {'sort_by': 'potential_savings'}, {'page': 50}],
+    'vms.vms_list': [{'status': 'Running', 'sort_by': 'potential_savings', 'sort_order': 'desc'}, {'page': 50}],
+    'vmss.vmss_list': [{'sort_by': 'recommendation_count', 'sort_order': 'desc'}],
+    'storage.storage_accounts_list': [{'kind': 'StorageV2', 'sort_by': 'sku'}, {'page': 50}],
+}
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+def benchmark_urls(app):
+    """
+    Builds (endpoint, url) pairs covering every GET route of the app: rules
+    without arguments as they are, rules with arguments once per sample value,
+    detail pages for the first resource of their type, and QUERY_VARIANTS.
+    """
+    resource_types = {config.get('DETAIL_ROUTE'): config.get('RESOURCE_TYPE') for config in app.service_configs}
+    urls = []
+    with app.test_request_context():
+        for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+            if rule.endpoint == 'static' or 'GET' not in rule.methods:
+                continue
+            arguments = sorted(rule.arguments)
+            if not arguments:
+                urls.append((rule.endpoint, url_for(rule.endpoint)))
+            elif arguments == ['resource_id']:
+                resource_id = db.session.query(Resource.id) \
+                    .filter(Resource.type == resource_types.get(rule.endpoint)).order_by(Resource.id).limit(1).scalar()
+                if resource_id:
+                    urls.append((rule.endpoint, url_for(rule.endpoint, resource_id=resource_id.lstrip('/'))))
+            elif len(arguments) == 1 and arguments[0] in ARGUMENT_SAMPLES:
+                for value in ARGUMENT_SAMPLES[arguments[0]]:
+                    urls.append((rule.endpoint, url_for(rule.endpoint, **{arguments[0]: value})))
+            else:
+                log(f"Skipping {rule.rule}: no sample values for {arguments}")
+            for args in QUERY_VARIANTS.get(rule.endpoint, []) if not arguments else []:
+                urls.append((rule.endpoint, url_for(rule.endpoint, **args)))
+    return urls
+
+def measure_url(app, client, url, repeat):
+    """
+    Requests a URL once cold, once with query capture, once under tracemalloc
+    and then `repeat` times for the latency percentiles. Streamed bodies are
+    read to the end, so exports are timed until the last byte.
+    """
+    with app.app_context():
+        engine = db.engine
+
+    def fetch():
+        # Unbuffered, so the client's copy of a large body doesn't count as the app's memory.
+        started = time.perf_counter()
+        response = client.get(url, buffered=False)
+        size = sum(len(chunk) for chunk in response.iter_encoded())
+        response.close()
+        return response.status_code, size, (time.perf_counter() - started) * 1000
+
+    status, size, cold_ms = fetch()
+    with capture_queries(engine) as queries:
+        fetch()
+    tracemalloc.start()
+    fetch()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = sorted(fetch()[2] for _ in range(repeat))
+    result = {
+        'url': url,
+        'status': status,
+        'bytes': size,
+        'queries': len(queries),
+        'peak_alloc_kb': round(peak / 1024, 1),
+        'cold_ms': round(cold_ms, 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'max_ms': round(latencies[-1], 2),
+    }
+    for p in PERCENTILES:
+        result[f"p{p}_ms"] = round(percentile(latencies, p), 2)
+    return result
+
+def run_benchmark(resources=None, data_dir=None, work_dir=None, repeat=DEFAULT_REPEAT,
+                  export_repeat=DEFAULT_EXPORT_REPEAT, workers=None, seed=0):
+    """
+    Generates a synthetic tenant of `resources` resources (or uses the CSVs in
+    data_dir), seeds it into a fresh database in work_dir, then drives every
+    route through the Flask test client. Returns the results as a dict.
+    """
+    work_dir = os.path.abspath(work_dir)
+    data_dir = os.path.abspath(data_dir or os.path.join(work_dir, 'data'))
+    results = {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'resources': resources,
+            'seed': seed,
+        },
+    }
+
+    if resources:
+        log(f"Generating {resources:,} resources in {data_dir}")
+        started = time.perf_counter()
+        results['generate'] = {'rows': generate_tenant(data_dir, resources, seed=seed),
+                               'seconds': round(time.perf_counter() - started, 2)}
+
+    database_path = os.path.join(work_dir, 'bench.db')
+    # Read by create_app through from_prefixed_env, so the benchmark never touches report.db or history.db.
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{database_path}"
+    os.environ['FLASK_HISTORY_DATABASE_URI'] = f"sqlite:///{os.path.join(work_dir, 'history.db')}"
+    app = create_app()
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+    try:
+        # The seeder's progress goes to stderr, so stdout only carries the JSON.
+        with contextlib.redirect_stdout(sys.stderr):
+            create_database(app)
+            advisor_file = ADVISOR_CSV if os.path.exists(ADVISOR_CSV) else next(
+                (name for name in sorted(os.listdir('.')) if name.startswith('Advisor')), None)
+            timings = run_seeders(app, 'Benchmark', 'May 01, 2024', advisor_file, workers=workers)
+            started = time.perf_counter()
+            write_analytics(database_path, database_path)
+            timings['analytics'] = time.perf_counter() - started
+    finally:
+        os.chdir(cwd)
+    results['seed'] = {key: ({k: round(v, 3) for k, v in value.items()} if isinstance(value, dict) else round(value, 3))
+                       for key, value in timings.items()}
+    results['seed']['peak_rss_mb'] = round(peak_memory_mb() or 0, 1)
+    results['seed']['database_mb'] = round(os.path.getsize(database_path) / (1024 * 1024), 1)
+
+    # Like diagnose.py: slow requests on big databases must not re-check the data version.
+    app.config['DATA_VERSION_TTL'] = float('inf')
+    client = app.test_client()
+    routes = []
+    for endpoint, url in benchmark_urls(app):
+        times = export_repeat if endpoint.endswith('_export') else repeat
+        result = measure_url(app, client, url, times)
+        result['endpoint'] = endpoint
+        routes.append(result)
+        log(f"{result['status']} {result['p50_ms']:>9.2f}ms p50 {result['p95_ms']:>9.2f}ms p95 "
+            f"{result['queries']:>3} queries {result['peak_alloc_kb']:>9.1f}kB  {url}")
+    results['routes'] = routes
+    results['meta']['peak_rss_mb'] = round(peak_memory_mb() or 0, 1)
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Seed a synthetic tenant and benchmark every route.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--resources', type=parse_size, help="Generate a tenant of this many resources, e.g. 10k, 100k or 1M.")
+    source.add_argument('--data', help="Use the CSV exports in this directory instead of generating them.")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f"Timed requests per page (default: {DEFAULT_REPEAT}).")
+    parser.add_argument('--export-repeat', type=int, default=DEFAULT_EXPORT_REPEAT,
+                        help=f"Timed requests per export (default: {DEFAULT_EXPORT_REPEAT}).")
+    parser.add_argument('--workers', type=int, default=None, help="Seeder worker processes (default: CPU count).")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed of the generated tenant (default: 0).")
+    parser.add_argument('--work-dir', help="Keep the generated CSVs and database here instead of a temporary directory.")
+    parser.add_argument('-o', '--output', help="Write the JSON results to this file instead of stdout.")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='azurereport-bench-')
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        bench_results = run_benchmark(args.resources, args.data, work_dir, repeat=max(args.repeat, 1),
+                                      export_repeat=max(args.export_repeat, 1), workers=args.workers, seed=args.seed)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    output = json.dumps(bench_results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        log(f"Results written to {args.output}")
+    else:
+        print(output)
@@ -0,0 +1,134 @@
+import argparse
+from flask import url_for
+from app import create_app, db
+from app.diagnostics import assert_max_queries, capture_queries, explain_query_plan, find_table_scans
+from app.services.core.models import Resource
+
+# Queries a warm page may run: the page, its count, the filter facets and a
+# few lookups. Page size must not change it.
+DEFAULT_QUERY_BUDGET = 12
+
+def sample_urls(app):
+    """Builds one URL per list and API route, plus filtered variants of the heavier ones."""
+    with app.test_request_context():
+        urls = [url_for(c['LIST_ROUTE']) for c in app.service_configs if c.get('LIST_ROUTE')]
+        urls += [
+            url_for('recs.recommendations_list'),
+            url_for('recs.recommendations_list', category='cost', impact='High'),
+            url_for('recs.recommendations_list', sort_by='potential_savings'),
+            url_for('main.index'),
+            url_for('main.search', q='vm'),
+            url_for('api.recommendations_summary'),
+            url_for('api.impact_by_category', category='cost'),
+            url_for('api.recommendations_by_subscription', group_by='impact'),
+            url_for('api.recommendations_by_subscription', group_by='category'),
+        ]
+    return urls
+
+def detail_urls(app):
+    """Builds one detail URL per service, for the first resource of its type in the database."""
+    mappers = {m.class_.__name__: m for m in Resource.__mapper__.polymorphic_map.values()}
+    urls = []
+    with app.test_request_context():
+        for config in app.service_configs:
+            mapper = mappers.get(config.get('MODEL_CLASS_NAME'))
+            if not mapper or not config.get('DETAIL_ROUTE'):
+                continue
+            resource_id = db.session.query(Resource.id).filter(Resource.type == mapper.polymorphic_identity).limit(1).scalar()
+            if resource_id:
+                urls.append(url_for(config['DETAIL_ROUTE'], resource_id=resource_id.lstrip('/')))
+    return urls
+
+def check_query_counts(app, urls, budget=DEFAULT_QUERY_BUDGET):
+    """
+    Requests each URL with the smallest and largest page size and checks that
+    both run the same number of queries, within the budget. Each URL is
+    requested once beforehand, so the counts are for warm caches. Prints one line
+    per URL and returns the number of URLs that failed.
+    """
+    client = app.test_client()
+    # Slow requests on big databases must not count a data version re-check.
+    app.config['DATA_VERSION_TTL'] = float('inf')
+    failed = 0
+    for url in urls:
+        with app.app_context():
+            engine = db.engine
+        client.get(url)
+        counts = []
+        for limit in (10, 100):
+            page_url = f"{url}{'&' if '?' in url else '?'}limit={limit}"
+            try:
+                with assert_max_queries(engine, budget) as queries:
+                    client.get(page_url)
+            except AssertionError as e:
+                print(f"FAIL {page_url}: {e}")
+                failed += 1
+                break
+            counts.append(len(queries))
+        else:
+            if counts[0] != counts[1]:
+                print(f"FAIL {url}: {counts[0]} queries at limit=10 but {counts[1]} at limit=100")
+                failed += 1
+            else:
+                print(f"ok   {url}: {counts[0]} queries")
+    return failed
+
+def explain_routes(app, urls, verbose=False):
+    """
+    Requests each URL, runs EXPLAIN QUERY PLAN on every SELECT it issued and
+    prints the plans. Returns the number of statements that scan a whole table.
+    """
+    client = app.test_client()
+    flagged = 0
+    for url in urls:
+        with app.app_context():
+            engine = db.engine
+        with capture_queries(engine) as queries:
+            response = client.get(url)
+        print(f"\n=== {url} [{response.status_code}] {len(queries)} queries")
+        for statement, parameters in queries:
+            if not statement.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = explain_query_plan(engine, statement, parameters)
+            scans = find_table_scans(plan)
+            flagged += bool(scans)
+            if scans or verbose:
+                print(f"\n{'FULL SCAN' if scans else 'OK'}: {' '.join(statement.split())}")
+                for step in plan:
+                    print(f"    {step}")
+    return flagged
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Diagnostics for the report database and routes.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    explain_parser = subparsers.add_parser('explain', help="Dump EXPLAIN QUERY PLAN for every list and API route.")
+    explain_parser.add_argument('urls', nargs='*', help="URLs to check instead of the default route list.")
+    explain_parser.add_argument('-v', '--verbose', action='store_true', help="Print plans for all queries, not only full scans.")
+    explain_parser.add_argument('--strict', action='store_true', help="Exit with status 1 if any query scans a whole table.")
+
+    queries_parser = subparsers.add_parser('queries', help="Check that list, API and detail routes run a fixed number of queries.")
+    queries_parser.add_argument('urls', nargs='*', help="URLs to check instead of the default route list.")
+    queries_parser.add_argument('--max', type=int, default=DEFAULT_QUERY_BUDGET,
+                                help=f"Most queries a single request may run (default: {DEFAULT_QUERY_BUDGET}).")
+
+    subparsers.add_parser('startup', help="Show the time create_app() spends loading each service.")
+    args = parser.parse_args()
+
+    flask_app = create_app()
+    if args.command == 'explain':
+        flagged = explain_routes(flask_app, args.urls or sample_urls(flask_app), verbose=args.verbose)
+        print(f"\n{flagged} queries scan a whole table.")
+        if args.strict and flagged:
+            exit(1)
+    elif args.command == 'queries':
+        urls = args.urls or sample_urls(flask_app) + detail_urls(flask_app)
+        failed = check_query_counts(flask_app, urls, budget=args.max)
+        print(f"\n{failed} of {len(urls)} routes exceeded the query budget.")
+        if failed:
+            exit(1)
+    elif args.command == 'startup':
+        print('\n'.join(flask_app.extensions['service_registry'].report()))
+        print(f"First create_app(): {flask_app.startup_seconds * 1000:.1f} ms.")
+        # Later apps in the same process, like test apps or extra workers, reuse the discovered services.
+        print(f"Next create_app(): {create_app().startup_seconds * 1000:.1f} ms.")
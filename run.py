@@ -1,9 +1,97 @@
 # This file is the new entry point to run the application.
-from app import create_app
+import argparse
+import os
+from app import create_app, db
 
-# Create an instance of the Flask application
-app = create_app()
+DEFAULT_THREADS = 8
+SERVERS = ('auto', 'gunicorn', 'waitress')
+
+def __getattr__(name):
+    # The module-level app, for `flask --app run`, is only built when first
+    # used, so `run.py --production` doesn't build a second app.
+    if name == 'app':
+        app = globals()['app'] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def create_production_app(threads):
+    """
+    The app as served in production: its SQLite connections refuse writes,
+    and each worker keeps a pool of about one connection per thread.
+    """
+    return create_app(config={
+        'SQLITE_QUERY_ONLY': True,
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': threads, 'max_overflow': threads},
+    })
+
+def serve_gunicorn(wsgi_app, host, port, workers, threads):
+    """Serves with gunicorn: `workers` processes of `threads` threads (Linux and macOS only)."""
+    from gunicorn.app.base import BaseApplication
+
+    def post_fork(server, worker):
+        # Connections must not be shared across processes; each worker opens its own,
+        # for every bind and every client already open.
+        with wsgi_app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+        router = wsgi_app.extensions.get('tenants')
+        if router is not None:
+            router.dispose(close=False)
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{host}:{port}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('post_fork', post_fork)
+
+        def load(self):
+            return wsgi_app
+
+    Server().run()
+
+def serve_waitress(wsgi_app, host, port, threads):
+    """Serves with waitress: one process of `threads` threads, on any platform."""
+    from waitress import serve
+    serve(wsgi_app, host=host, port=port, threads=threads)
+
+def serve(host, port, workers, threads, server='auto'):
+    """Serves the production app with gunicorn or waitress, whichever is installed, or the one asked for."""
+    if server == 'auto':
+        server = 'waitress' if os.name == 'nt' else 'gunicorn'
+        try:
+            __import__(server)
+        except ImportError:
+            server = 'waitress'
+    wsgi_app = create_production_app(threads)
+    try:
+        if server == 'gunicorn':
+            serve_gunicorn(wsgi_app, host, port, workers, threads)
+        else:
+            if workers > 1:
+                print(f"waitress serves from a single process; ignoring --workers {workers}.")
+            serve_waitress(wsgi_app, host, port, threads)
+    except ImportError:
+        print(f"The production server needs {server}: pip install {server}")
+        exit(1)
 
 if __name__ == "__main__":
-    # Run the app in debug mode
-    app.run(debug=True)
+    parser = argparse.ArgumentParser(description="Run the Azure report web app.")
+    parser.add_argument("--production", action="store_true",
+                        help="Serve with a multi-threaded WSGI server (gunicorn or waitress) instead of the debug server.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=5000, help="Port to listen on (default: 5000).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes, with gunicorn (default: CPU count).")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS,
+                        help=f"Threads per worker (default: {DEFAULT_THREADS}).")
+    parser.add_argument("--server", choices=SERVERS, default='auto',
+                        help="Production server (default: gunicorn if installed, waitress on Windows or without gunicorn).")
+    args = parser.parse_args()
+
+    if args.production:
+        serve(args.host, args.port, args.workers, args.threads, args.server)
+    else:
+        # Run the app in debug mode
+        create_app().run(debug=True, host=args.host, port=args.port)
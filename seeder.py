@@ -1,10 +1,38 @@
 import os
+import sys
 import argparse
 from datetime import datetime
 import re
 import glob
+import hashlib
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import closing
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateIndex
 from app import create_app, db
-from app.services import get_service_configs
+from app.analytics import facts_path_for, remove_stale_facts, write_facts
+from app.db import sqlite_path
+from app.history import prune_history, record_snapshot
+from app.tenants import tenant_database_config
+from app.services import get_service_configs, resolve
+from app.services.core.bulk import DEFAULT_CHUNK_SIZE, spool_rows, iter_spooled_rows
+from app.services.core.kpis import write_kpi_snapshot
+from app.services.core.models import SeedFile
+from app.services.core.seeder import seed_client_info, stamp_data_version
+from app.search import build_search_index
+
+def peak_memory_mb():
+    """Returns the peak resident set size of this process in MB, if the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
 
 def find_advisor_file():
     """Finds the advisor CSV file and extracts the date from its name."""
@@ -28,49 +56,389 @@ def find_advisor_file():
 def create_database(app):
     """Creates the database and tables from the models."""
     with app.app_context():
-        db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+        db_path = sqlite_path(app)
         if os.path.exists(db_path):
             os.remove(db_path)
             print(f"Removed existing database '{db_path}'.")
-        db.create_all()
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        db.create_all(bind_key=None)
+        enable_wal(db)
         print("Database structure created successfully from models.")
 
-def run_seeders(app, client_name, report_date, advisor_csv_file):
-    """Dynamically discovers and runs all service seeders."""
+def upgrade_database(app):
+    """
+    Prepares an existing database for an incremental run without dropping any
+    data: creates missing tables, columns and indexes. Falls back to
+    create_database when there is no database yet. Returns True if the
+    database was kept.
+    """
     with app.app_context():
-        service_configs = get_service_configs()
+        db_path = sqlite_path(app)
+        if not os.path.exists(db_path):
+            print(f"No existing database at '{db_path}', running a full seed.")
+            create_database(app)
+            return False
+        db.create_all(bind_key=None)
+        added = ensure_columns(db)
+        if added:
+            # The new columns are only filled in as rows are written, so no service counts as unchanged.
+            with db.engine.begin() as connection:
+                connection.execute(SeedFile.__table__.delete())
+            print(f"Added columns {', '.join(added)}; every service will be re-seeded.")
+        ensure_indexes(db)
+        enable_wal(db)
+        print(f"Using existing database '{db_path}' for an incremental update.")
+        return True
+
+def ensure_columns(db):
+    """
+    Adds the columns declared on the models that an older database is
+    missing, as NULL columns, and returns their names as table.column.
+    """
+    added = []
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=connection.dialect)
+                    connection.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+                    added.append(f"{table.name}.{column.name}")
+    return added
+
+def ensure_indexes(db):
+    """Creates indexes declared on the models that an older database is missing."""
+    # IF NOT EXISTS rather than checkfirst, since SQLite reflection skips expression indexes.
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+def enable_wal(db):
+    """
+    Switches the database to write-ahead logging while it is seeded, which
+    needs fewer syncs than the rollback journal for large writes.
+    """
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+
+def record_history(app, report_path, report_date, client_name, keep=None):
+    """
+    Adds the seeded database to the history as the snapshot of its report
+    date, then keeps only the `keep` newest snapshots if given. A report
+    older than the latest snapshot is left out with a warning.
+    """
+    with app.app_context():
+        try:
+            changes = record_snapshot(report_path, datetime.strptime(report_date, '%B %d, %Y').date(), client_name)
+        except ValueError as e:
+            print(f"Warning: {e} The report was not added to the history.")
+            return None
+        resources, recommendations = changes['resource_versions'], changes['recommendation_versions']
+        print(f"{'Replaced' if changes['replaced'] else 'Added'} the {report_date} history snapshot: "
+              f"{resources[0]} new and {resources[1]} ended resource versions, "
+              f"{recommendations[0]} new and {recommendations[1]} ended recommendation versions.")
+        if keep:
+            pruned = prune_history(keep)
+            if pruned:
+                print(f"Removed {pruned} history snapshots beyond the newest {keep}.")
+        return changes
+
+def write_analytics(build_path, db_path):
+    """
+    Writes the recommendation facts of the database at build_path to the
+    Parquet file the web app will look for once it is published at db_path.
+    Returns the file path, or None when DuckDB is not installed.
+    """
+    with closing(sqlite3.connect(build_path)) as connection:
+        version = connection.execute('SELECT version FROM data_version WHERE id = 1').fetchone()[0]
+    facts_path = facts_path_for(db_path, version)
+    started = time.perf_counter()
+    rows = write_facts(build_path, facts_path)
+    if rows is None:
+        print("DuckDB is not installed, so the dashboard aggregations will query SQLite (pip install duckdb).")
+        return None
+    print(f"Wrote {rows} recommendation facts to '{facts_path}' in {time.perf_counter() - started:.2f}s.")
+    return facts_path
+
+def build_path_for(db_path):
+    """Where the next version of the database at db_path is built before it is published."""
+    return f"{db_path}.new"
+
+def copy_database(source_path, target_path):
+    """Copies a database with SQLite's backup API, which reads a consistent snapshot."""
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(target_path + suffix):
+            os.remove(target_path + suffix)
+    with closing(sqlite3.connect(source_path)) as source, closing(sqlite3.connect(target_path)) as target:
+        source.backup(target)
+
+def publish_database(build_path, db_path):
+    """
+    Replaces the database at db_path with the one at build_path in a single
+    rename. Web workers keep reading the old file on their open connections
+    and switch to the new one on their next request.
+
+    The published file uses the rollback journal, not WAL: -wal and -shm
+    files are found by name, so a WAL database renamed over another one
+    could be read together with the sidecar files of the file it replaced.
+    """
+    with closing(sqlite3.connect(build_path)) as connection:
+        connection.execute('PRAGMA journal_mode=DELETE')
+    if os.path.exists(db_path):
+        # A database from before snapshots were published is still in WAL mode.
+        with closing(sqlite3.connect(db_path, timeout=10)) as connection:
+            try:
+                connection.execute('PRAGMA journal_mode=DELETE')
+            except sqlite3.OperationalError:
+                pass
+    os.replace(build_path, db_path)
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    print(f"Published the new database to '{db_path}'.")
+
+def file_sha256(path):
+    """Returns the hex SHA-256 of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def service_files(config, context):
+    """Returns {path: sha256} for the CSVs a service seeds from that currently exist."""
+    files = config.get('CSV_FILES') or [config.get('CSV_FILE')]
+    paths = [f.format(**context) for f in files if f]
+    return {path: file_sha256(path) for path in paths if os.path.exists(path)}
+
+def find_unchanged_services(ordered_configs, context):
+    """
+    Returns the keys of services whose CSVs have the same content hashes as on
+    the last run. A service is only unchanged if everything it depends on is
+    unchanged too, since its rows are resolved against its dependencies.
+    """
+    stored = {}
+    for seed_file in SeedFile.query.all():
+        stored.setdefault(seed_file.service_key, set()).add(seed_file.sha256)
+
+    unchanged = set()
+    for config in ordered_configs:
+        key = config['KEY']
+        hashes = set(service_files(config, context).values())
+        deps_unchanged = all(dep in unchanged for dep in config.get('DEPENDS_ON', []))
+        if hashes and hashes == stored.get(key) and deps_unchanged:
+            unchanged.add(key)
+    return unchanged
+
+def record_service_files(config, context):
+    """Stores the content hashes of the files a service was just seeded from."""
+    SeedFile.query.filter_by(service_key=config['KEY']).delete()
+    seeded_at = datetime.now().isoformat(timespec='seconds')
+    for path, sha256 in service_files(config, context).items():
+        db.session.add(SeedFile(service_key=config['KEY'], path=path, sha256=sha256, seeded_at=seeded_at))
+
+def resolve_seed_order(service_configs):
+    """
+    Orders the services with a seeder so that every service comes after the
+    services named in its DEPENDS_ON list. Raises ValueError on unknown or
+    circular dependencies.
+    """
+    configs = {c['KEY']: c for c in service_configs if c.get('SEEDER_FUNC')}
+    for key, config in configs.items():
+        missing = [dep for dep in config.get('DEPENDS_ON', []) if dep not in configs]
+        if missing:
+            raise ValueError(f"Service '{key}' depends on unknown service(s): {', '.join(missing)}")
+
+    order, done = [], set()
+    remaining = sorted(configs)
+    while remaining:
+        ready = [key for key in remaining if all(dep in done for dep in configs[key].get('DEPENDS_ON', []))]
+        if not ready:
+            raise ValueError(f"Circular seeder dependencies between: {', '.join(remaining)}")
+        for key in ready:
+            order.append(configs[key])
+            done.add(key)
+            remaining.remove(key)
+    return order
+
+def seed_service(config, context, rows=None, stats=None):
+    """
+    Runs one service's seeder in this process, the only place the database is
+    written. Returns the seconds it took.
+    """
+    print(f"--- Seeding {config.get('NAME', config['KEY'])} ---")
+    started = time.perf_counter()
+    if rows is None:
+        resolve(config, 'SEEDER_FUNC')(db, context)
+    else:
+        resolve(config, 'SEEDER_FUNC')(db, context, rows=rows, stats=stats)
+    record_service_files(config, context)
+    db.session.flush()
+    # Nothing from one service needs to stay in the identity map for the next.
+    db.session.expunge_all()
+    elapsed = time.perf_counter() - started
+    print(f"Finished {config.get('NAME', config['KEY'])} in {elapsed:.2f}s.")
+    return elapsed
+
+def run_seeders_parallel(ordered_configs, context, workers, done=(), timings=None):
+    """
+    Parses the CSVs of services whose dependencies are already seeded in a
+    process pool, and writes each parsed service as soon as it is ready.
+    Services without a PARSER_FUNC are seeded inline. `done` holds the keys
+    of services that count as seeded already. The seconds spent writing each
+    service are stored in `timings` by service key.
+    """
+    timings = {} if timings is None else timings
+    done, pending = set(done), {}
+    remaining = list(ordered_configs)
+    with tempfile.TemporaryDirectory(prefix='seeder-') as spool_dir, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        while remaining or pending:
+            ready = [c for c in remaining if all(dep in done for dep in c.get('DEPENDS_ON', []))]
+            for config in ready:
+                remaining.remove(config)
+                if config.get('PARSER_FUNC'):
+                    spool_path = os.path.join(spool_dir, f"{config['KEY']}.pickle")
+                    future = pool.submit(spool_rows, resolve(config, 'PARSER_FUNC'), dict(context), spool_path)
+                    pending[future] = config
+                else:
+                    timings[config['KEY']] = seed_service(config, context)
+                    done.add(config['KEY'])
+            if not pending:
+                continue
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                config = pending.pop(future)
+                spool_path, stats = future.result()
+                timings[config['KEY']] = seed_service(config, context, rows=iter_spooled_rows(spool_path), stats=stats)
+                os.remove(spool_path)
+                done.add(config['KEY'])
+
+def run_seeders(app, client_name, report_date, advisor_csv_file, chunk_size=None, workers=None, incremental=False):
+    """
+    Dynamically discovers and runs all service seeders in dependency order.
+    In incremental mode, rows are upserted, services whose CSVs are unchanged
+    are skipped, and rows missing from the new exports are deleted.
+    Returns the seconds spent on each step: {'services': {key: seconds},
+    'post_seed', 'kpi_snapshot', 'search_index', 'commit', 'analyze', 'total'}.
+    """
+    with app.app_context():
+        ordered_configs = resolve_seed_order(get_service_configs())
         
         seeder_context = {
             'client_name': client_name,
             'report_date': report_date,
-            'advisor_csv_file': advisor_csv_file
+            'advisor_csv_file': advisor_csv_file,
+            'chunk_size': chunk_size,
+            'incremental': incremental
         }
+
+        timings = {'services': {}}
+        started = time.perf_counter()
+        seed_client_info(db, seeder_context)
+
+        unchanged = find_unchanged_services(ordered_configs, seeder_context) if incremental else set()
+        for config in ordered_configs:
+            if config['KEY'] in unchanged:
+                print(f"--- Skipping {config.get('NAME', config['KEY'])} (CSV unchanged) ---")
+                if config.get('RESTORE_FUNC'):
+                    resolve(config, 'RESTORE_FUNC')(db, seeder_context)
+        to_seed = [c for c in ordered_configs if c['KEY'] not in unchanged]
+
+        if workers is None:
+            workers = min(os.cpu_count() or 1, len(to_seed))
+        if workers > 1:
+            run_seeders_parallel(to_seed, seeder_context, workers, done=unchanged, timings=timings['services'])
+        else:
+            for config in to_seed:
+                timings['services'][config['KEY']] = seed_service(config, seeder_context)
+
+        # Derived tables that read across services are rebuilt once all of them are seeded.
+        step = time.perf_counter()
+        for config in ordered_configs:
+            if config.get('POST_SEED_FUNC'):
+                resolve(config, 'POST_SEED_FUNC')(db, seeder_context)
+        timings['post_seed'] = time.perf_counter() - step
+        step = time.perf_counter()
+        write_kpi_snapshot(db, get_service_configs())
+        timings['kpi_snapshot'] = time.perf_counter() - step
+        step = time.perf_counter()
+        build_search_index(db)
+        timings['search_index'] = time.perf_counter() - step
+        stamp_data_version(db)
         
-        seed_order = ['core', 'virtual_machines', 'vm_scale_sets', 'storage_accounts', 'recommendations']
-        
-        for service_key in seed_order:
-            config = next((c for c in service_configs if c.get('KEY') == service_key), None)
-            if config and config.get('SEEDER_FUNC'):
-                print(f"--- Seeding {config.get('NAME', service_key)} ---")
-                
-                if service_key == 'recommendations':
-                    config['SEEDER_FUNC'](db, seeder_context, advisor_csv_file)
-                else:
-                    config['SEEDER_FUNC'](db, seeder_context)
-        
-        # The final commit is now handled within each seeder
-        print("\nAll seeders completed successfully.")
+        # Everything is committed in one transaction, so readers never see a half-seeded database.
+        step = time.perf_counter()
+        db.session.commit()
+        timings['commit'] = time.perf_counter() - step
+        # Refresh the planner statistics so the list queries pick the right indexes.
+        step = time.perf_counter()
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('ANALYZE')
+        timings['analyze'] = time.perf_counter() - step
+        timings['total'] = time.perf_counter() - started
+        print(f"\nAll seeders completed successfully in {timings['total']:.2f}s.")
+        peak_mb = peak_memory_mb()
+        if peak_mb is not None:
+            print(f"Peak memory: {peak_mb:,.0f} MB")
+        return timings
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Seed Azure Advisor report data into a SQLite database.")
     parser.add_argument("client_name", type=str, help="The name of the client for this report.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Number of rows written per bulk insert batch (default: {DEFAULT_CHUNK_SIZE}).")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Update the existing database in place: skip unchanged CSVs, upsert rows and delete only rows that disappeared.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes used to parse CSVs of independent services (default: CPU count). Use 1 to seed serially.")
+    parser.add_argument("--no-history", action="store_true",
+                        help="Do not add this report to the history database.")
+    parser.add_argument("--keep-history", type=int, default=None,
+                        help="Number of report snapshots to keep in the history database (default: all).")
+    parser.add_argument("--tenant", default=None,
+                        help="Seed the report of this client in TENANTS_DIR, for the multi-tenant web app, instead of report.db.")
     args = parser.parse_args()
 
-    flask_app = create_app()
+    tenant_config = {}
+    if args.tenant:
+        try:
+            tenant_config = tenant_database_config(create_app(with_routes=False).config['TENANTS_DIR'], args.tenant)
+        except ValueError as e:
+            parser.error(str(e))
+    # The new data is written to a copy, so the web app keeps serving the
+    # current database until the finished one replaces it.
+    db_path = sqlite_path(create_app(with_routes=False, config=tenant_config))
+    if args.tenant:
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    build_path = build_path_for(db_path)
+    flask_app = create_app(with_routes=False, config={**tenant_config, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{build_path}"})
     advisor_file, report_date = find_advisor_file()
-    
-    create_database(flask_app)
-    run_seeders(flask_app, args.client_name, report_date, advisor_file)
-    
+
+    if args.incremental and os.path.exists(db_path):
+        copy_database(db_path, build_path)
+    if args.incremental:
+        incremental = upgrade_database(flask_app)
+    else:
+        create_database(flask_app)
+        incremental = False
+    run_seeders(flask_app, args.client_name, report_date, advisor_file,
+                chunk_size=args.chunk_size, workers=args.workers, incremental=incremental)
+    # Recorded before publishing, so the web app never sees the new report without its history.
+    # Should publishing fail, the next run for the same date replaces the snapshot.
+    if not args.no_history:
+        record_history(flask_app, build_path, report_date, args.client_name, keep=args.keep_history)
+    # Named after the new data version, so it is in place before the database that refers to it.
+    facts_path = write_analytics(build_path, db_path)
+    with flask_app.app_context():
+        db.engine.dispose()
+    publish_database(build_path, db_path)
+    remove_stale_facts(db_path, facts_path)
+
     print("\nDatabase seeding complete. You can now run 'python run.py'.")